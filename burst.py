@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from PIL import Image
+
+
+class BurstCapture:
+    """Capture frames of one area at a fixed rate into a bounded RAM ring buffer
+
+    Frames are kept as raw pixels in preallocated slots and handed to the
+    save pipeline either while the burst runs (encode_during) or once it has
+    finished, so capture timing never waits on PNG compression. A slot is
+    reused as soon as its frame has been encoded; when no slot is free the
+    frame is skipped and counted as dropped.
+    """
+
+    def __init__(self, backend, bbox, folder, pipeline, frames=30, fps=10,
+                 max_bytes=512 * 1024 * 1024, encode_during=True, encoder=None):
+        self.backend = backend
+        self.encoder = encoder
+        self.bbox = bbox
+        self.folder = folder
+        self.pipeline = pipeline
+        self.frames = frames
+        self.fps = fps
+        self.encode_during = encode_during
+
+        self.size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+        if self.size[0] <= 0 or self.size[1] <= 0:
+            raise ValueError("Capture area is empty")
+        frame_bytes = self.size[0] * self.size[1] * 4
+        self.capacity = max(1, min(frames, max_bytes // frame_bytes))
+        if not encode_during:
+            # Without concurrent encoding the ring has to hold the whole burst
+            self.frames = min(frames, self.capacity)
+
+        self.slots = []
+        self.free = queue.Queue()
+        self.ready = queue.Queue()
+        self.jobs = []
+        self.stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Results
+        self.timestamps = []
+        self.captured = 0
+        self.dropped = 0
+        self.late = 0
+        self.error = None
+        self.last_frame = None
+
+        self.stop_event = threading.Event()
+        self.capture_done = threading.Event()
+
+    def start(self):
+        """Start capturing and feeding the save pipeline in the background"""
+        threading.Thread(target=self._capture, name="burst-capture", daemon=True).start()
+        threading.Thread(target=self._feed, name="burst-feed", daemon=True).start()
+
+    def cancel(self):
+        """Stop capturing, frames already taken are still saved"""
+        self.stop_event.set()
+
+    @property
+    def saved(self):
+        return sum(1 for job in self.jobs if job.done)
+
+    @property
+    def finished(self):
+        """True once every captured frame has been written or failed"""
+        return self.capture_done.is_set() and self.ready.empty() and len(self.jobs) == self.captured \
+            and all(job.done for job in self.jobs)
+
+    def _capture(self):
+        backend = self.backend.clone()
+        try:
+            # Preallocate the ring before timing starts
+            self.slots = [Image.new("RGB", self.size) for _ in range(self.capacity)]
+            for slot in range(self.capacity):
+                self.free.put(slot)
+
+            interval = 1.0 / self.fps
+            start = time.perf_counter()
+            for index in range(self.frames):
+                delay = start + index * interval - time.perf_counter()
+                if delay > 0:
+                    if self.stop_event.wait(delay):
+                        break
+                elif self.stop_event.is_set():
+                    break
+                elif delay < -interval:
+                    self.late += 1
+
+                try:
+                    slot = self.free.get_nowait()
+                except queue.Empty:
+                    self.dropped += 1
+                    continue
+
+                backend.grab_into(self.slots[slot], self.bbox)
+                self.timestamps.append(time.perf_counter() - start)
+                self.captured += 1
+                self.last_frame = self.slots[slot]
+                self.ready.put((index, slot))
+        except Exception as e:
+            self.error = e
+        finally:
+            backend.close()
+            self.capture_done.set()
+            self.ready.put(None)
+
+    def _feed(self):
+        if not self.encode_during:
+            self.capture_done.wait()
+        while True:
+            item = self.ready.get()
+            if item is None:
+                return
+            index, slot = item
+            job = self.pipeline.submit(
+                self.slots[slot],
+                self.folder,
+                timeout=None,
+                release=lambda image, slot=slot: self.free.put(slot),
+                name=f"burst_{self.stamp}_{index + 1:04d}",
+                encoder=self.encoder,
+                bbox=self.bbox
+            )
+            self.jobs.append(job)
+
+    def summary(self):
+        """Describe the achieved frame rate and losses"""
+        if len(self.timestamps) > 1:
+            achieved = (len(self.timestamps) - 1) / (self.timestamps[-1] - self.timestamps[0])
+        else:
+            achieved = 0.0
+        return (f"{self.captured} frames at {achieved:.1f} fps "
+                f"(target {self.fps}, dropped {self.dropped}, late {self.late})")
@@ -0,0 +1,148 @@
+import json
+import time
+
+import settings_store
+from capture_backends import GrabSession, create_backend
+from capture_index import CaptureIndex
+from dedup import DedupIndex
+from encoders import create_encoder
+from save_pipeline import SavePipeline
+from screen_layout import MonitorLayout, area_to_bbox
+
+
+class CaptureSession:
+    """Reusable capture context for using the tool from other Python programs
+
+    Holds the monitor layout, the capture backend, the save workers and the
+    encoders, so repeated captures pay none of the setup cost:
+
+        with CaptureSession() as session:
+            image = session.capture((0, 0, 800, 600))
+            path = session.capture_to_file((0, 0, 800, 600), "Reports")
+
+    Areas are (x, y, width, height) relative to the virtual screen, the
+    same coordinates the main window uses. A session must be used from the
+    thread that created it.
+    """
+
+    def __init__(self, settings=None, settings_file=settings_store.SETTINGS_FILE, backend=None, encoder=None):
+        self.settings = settings if settings is not None else settings_store.load_settings(settings_file)
+        self.backend = create_backend(backend or self.settings["capture_backend"])
+        self.grab_session = GrabSession(self.backend)
+        self.encoder = create_encoder(encoder) if encoder else None
+        self.encoders = {}
+        self.dedup = DedupIndex(self.settings["dedup_mode"])
+        self.layout = MonitorLayout(self.backend)
+        index_file = self.settings["capture_index_file"]
+        self.index = CaptureIndex(index_file, self.layout) if index_file else None
+        self.pipeline = SavePipeline(
+            workers=self.settings["save_workers"],
+            max_queue=self.settings["save_queue_size"],
+            dedup=self.dedup,
+            keep_results=False,
+            index=self.index
+        )
+        self.pipeline.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Finish pending saves and release the backend"""
+        self.pipeline.shutdown(wait=True)
+        self.grab_session.close()
+        if self.index:
+            self.index.close()
+
+    @property
+    def virtual_screen(self):
+        return self.layout.virtual_screen
+
+    @property
+    def monitors(self):
+        """Geometry of every monitor, in screen coordinates"""
+        return self.layout.monitors
+
+    def refresh_layout(self):
+        """Query the monitors again, after they were added or rearranged"""
+        self.layout.refresh()
+
+    def bbox(self, area):
+        """Screen bounding box of an area"""
+        return area_to_bbox(area, self.virtual_screen)
+
+    def encoder_for(self, folder):
+        """Encoder used for folder: the session's own, or the folder's format from the settings"""
+        if self.encoder:
+            return self.encoder
+        config = settings_store.folder_encoder_config(self.settings, folder)
+        key = json.dumps(config, sort_keys=True)
+        if key not in self.encoders:
+            self.encoders[key] = create_encoder(config)
+        return self.encoders[key]
+
+    def capture(self, area):
+        """Capture area and return it as a new RGB image owned by the caller"""
+        return self.backend.grab(self.bbox(area))
+
+    def capture_many(self, areas):
+        """Capture several areas as close together in time as possible
+
+        Areas close to each other are cut from a single grab of their
+        union; spread-out areas are grabbed one by one.
+        """
+        boxes = [self.bbox(area) for area in areas]
+        if not boxes:
+            return []
+        union = (
+            min(box[0] for box in boxes),
+            min(box[1] for box in boxes),
+            max(box[2] for box in boxes),
+            max(box[3] for box in boxes)
+        )
+        union_pixels = (union[2] - union[0]) * (union[3] - union[1])
+        total_pixels = sum((box[2] - box[0]) * (box[3] - box[1]) for box in boxes)
+        if len(boxes) == 1 or union_pixels > 2 * total_pixels:
+            return [self.backend.grab(box) for box in boxes]
+
+        frame = self.backend.grab(union)
+        return [
+            frame.crop((box[0] - union[0], box[1] - union[1], box[2] - union[0], box[3] - union[1]))
+            for box in boxes
+        ]
+
+    def capture_to_file(self, area, folder="", wait=True, name=None):
+        """Capture area and save it under folder, relative to the master folder
+
+        With wait set, returns the saved path and raises if saving failed;
+        otherwise returns the save job straight away.
+        """
+        encoder = self.encoder_for(folder)
+        bbox = self.bbox(area)
+        grab_start = time.perf_counter()
+        frame = self.grab_session.grab(bbox)
+        grab_time = time.perf_counter() - grab_start
+
+        job = self.pipeline.submit(
+            frame,
+            settings_store.folder_path(self.settings, folder),
+            timeout=None,
+            release=self.grab_session.release,
+            name=name,
+            encoder=encoder,
+            bbox=bbox
+        )
+        job.grab_time = grab_time
+        if not wait:
+            return job
+        job.wait()
+        if not job.ok:
+            raise job.error
+        return job.filename
+
+    def stats(self):
+        """Allocation counters of the grab session"""
+        return self.grab_session.stats()
@@ -0,0 +1,592 @@
+import os
+import sys
+import time
+import threading
+import ctypes
+import ctypes.util
+from PIL import Image, ImageDraw, ImageGrab
+
+
+class CaptureBackend:
+    """Base class for screen capture backends
+
+    Bounding boxes are (left, top, right, bottom) in screen coordinates.
+    A backend instance must only be used from the thread that created it.
+    """
+    name = None
+
+    # Pixel buffers allocated by the backend itself
+    allocations = 0
+    bytes_allocated = 0
+
+    @classmethod
+    def available(cls):
+        """Check whether this backend can run on the current system"""
+        return True
+
+    def grab(self, bbox=None):
+        """Capture bbox, or the whole virtual screen when bbox is None, as an RGB image"""
+        raise NotImplementedError
+
+    def grab_into(self, image, bbox):
+        """Capture bbox into an existing RGB image of the same size"""
+        grabbed = self.grab(bbox)
+        self.allocations += 1
+        self.bytes_allocated += grabbed.width * grabbed.height * 4
+        image.paste(grabbed)
+
+    def clone(self):
+        """Create an independent backend of the same kind, for use on another thread"""
+        return type(self)()
+
+    def virtual_screen(self):
+        """Return (x, y, width, height) of the area this backend can capture
+
+        None when the backend cannot tell without grabbing the whole screen.
+        """
+        return None
+
+    def close(self):
+        """Release any connection held by the backend"""
+        pass
+
+
+class PillowBackend(CaptureBackend):
+    """Capture through PIL.ImageGrab"""
+    name = "pillow"
+
+    def grab(self, bbox=None):
+        # Windows only grabs the primary monitor unless asked for all of them
+        return ImageGrab.grab(bbox=bbox, all_screens=sys.platform == "win32")
+
+
+class MssBackend(CaptureBackend):
+    """Capture through the optional mss package"""
+    name = "mss"
+
+    @classmethod
+    def available(cls):
+        try:
+            import mss  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def __init__(self):
+        import mss
+        # Newer releases renamed the factory
+        self.sct = getattr(mss, "MSS", mss.mss)()
+
+    def grab(self, bbox=None):
+        if bbox is None:
+            monitor = self.sct.monitors[0]
+        else:
+            monitor = {
+                "left": bbox[0],
+                "top": bbox[1],
+                "width": bbox[2] - bbox[0],
+                "height": bbox[3] - bbox[1]
+            }
+        shot = self.sct.grab(monitor)
+        return Image.frombuffer("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def grab_into(self, image, bbox):
+        shot = self.sct.grab({
+            "left": bbox[0],
+            "top": bbox[1],
+            "width": bbox[2] - bbox[0],
+            "height": bbox[3] - bbox[1]
+        })
+        # mss hands back its own buffer, the PIL side is decoded in place
+        self.allocations += 1
+        self.bytes_allocated += len(shot.bgra)
+        image.frombytes(shot.bgra, "raw", "BGRX")
+
+    def virtual_screen(self):
+        monitor = self.sct.monitors[0]
+        return (monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+
+    def close(self):
+        self.sct.close()
+
+
+class XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+        ("obdata", ctypes.c_void_p),
+        ("create_image", ctypes.c_void_p),
+        ("destroy_image", ctypes.c_void_p),
+        ("get_pixel", ctypes.c_void_p),
+        ("put_pixel", ctypes.c_void_p),
+        ("sub_image", ctypes.c_void_p),
+        ("add_pixel", ctypes.c_void_p)
+    ]
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int)
+    ]
+
+
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+DESTROY_IMAGE = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(XImage))
+
+# The Xlib error handler is process-wide and shared with Tk, so it is only
+# swapped in around the calls that can fail and restored straight after.
+# The lock keeps those windows from overlapping between threads.
+_x_error_lock = threading.Lock()
+# Display to the errors seen on it, while errors are being trapped
+_x_errors = {}
+_x_previous_handler = None
+
+
+def _on_x_error(display, event):
+    errors = _x_errors.get(display)
+    if errors is not None:
+        errors.append(event)
+        return 0
+    # Not ours, e.g. Tk's connection: hand it to whoever was installed before
+    if _x_previous_handler:
+        return X_ERROR_HANDLER(_x_previous_handler)(display, event)
+    return 0
+
+
+# Kept alive for the whole process, Xlib may still hold it after a backend is gone
+_X_ERROR_CALLBACK = X_ERROR_HANDLER(_on_x_error)
+
+
+class XShmBackend(CaptureBackend):
+    """Capture on X11 through the MIT-SHM extension
+
+    The server copies pixels straight into a shared memory segment, which is
+    kept between grabs and only reallocated when the grab size changes.
+    """
+    name = "xshm"
+
+    Z_PIXMAP = 2
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+    ALL_PLANES = 0xFFFFFFFF
+
+    @classmethod
+    def available(cls):
+        if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+            return False
+        try:
+            backend = cls()
+        except Exception:
+            return False
+        backend.close()
+        return True
+
+    def __init__(self):
+        self.xlib = self._load("X11")
+        self.xext = self._load("Xext")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._declare()
+
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            raise RuntimeError("Cannot open X display")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+            raise RuntimeError("X server does not support MIT-SHM")
+
+        screen = self.xlib.XDefaultScreen(self.display)
+        self.root_window = self.xlib.XRootWindow(self.display, screen)
+        self.visual = self.xlib.XDefaultVisual(self.display, screen)
+        self.depth = self.xlib.XDefaultDepth(self.display, screen)
+        self.screen_size = (
+            self.xlib.XDisplayWidth(self.display, screen),
+            self.xlib.XDisplayHeight(self.display, screen)
+        )
+
+        self.shminfo = None
+        self.ximage = None
+        self.size = None
+
+    @staticmethod
+    def _load(name):
+        path = ctypes.util.find_library(name)
+        if not path:
+            raise RuntimeError(f"lib{name} not found")
+        return ctypes.CDLL(path)
+
+    def _declare(self):
+        xlib, xext, libc = self.xlib, self.xext, self.libc
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        xlib.XRootWindow.restype = ctypes.c_ulong
+        xlib.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDefaultVisual.restype = ctypes.c_void_p
+        xlib.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+        xlib.XSetErrorHandler.restype = ctypes.c_void_p
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint
+        ]
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _trapping_errors(self, call, *args):
+        """Run an X call and sync, returning the X errors it caused
+
+        Xlib's default error handler exits the process, so errors are
+        recorded instead, through a handler installed only for this call.
+        """
+        global _x_previous_handler
+        errors = []
+        with _x_error_lock:
+            _x_errors[self.display] = errors
+            _x_previous_handler = self.xlib.XSetErrorHandler(ctypes.cast(_X_ERROR_CALLBACK, ctypes.c_void_p))
+            try:
+                call(*args)
+                self.xlib.XSync(self.display, 0)
+            finally:
+                self.xlib.XSetErrorHandler(_x_previous_handler)
+                _x_previous_handler = None
+                del _x_errors[self.display]
+        return errors
+
+    def _allocate(self, size):
+        """Create the shared memory image for a grab of size"""
+        self._release()
+        width, height = size
+        shminfo = XShmSegmentInfo()
+        ximage = self.xext.XShmCreateImage(
+            self.display, self.visual, self.depth, self.Z_PIXMAP, None, ctypes.byref(shminfo), width, height
+        )
+        if not ximage:
+            raise RuntimeError("XShmCreateImage failed")
+
+        length = ximage.contents.bytes_per_line * height
+        shminfo.shmid = self.libc.shmget(self.IPC_PRIVATE, length, self.IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            DESTROY_IMAGE(ximage.contents.destroy_image)(ximage)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        address = self.libc.shmat(shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+            DESTROY_IMAGE(ximage.contents.destroy_image)(ximage)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        self.allocations += 1
+        self.bytes_allocated += length
+        ximage.contents.data = address
+
+        attach_errors = self._trapping_errors(self.xext.XShmAttach, self.display, ctypes.byref(shminfo))
+        # Segment is freed automatically once both sides detach
+        self.libc.shmctl(shminfo.shmid, self.IPC_RMID, None)
+        if attach_errors:
+            # Never attached on the server side, so there is nothing to detach
+            DESTROY_IMAGE(ximage.contents.destroy_image)(ximage)
+            self.libc.shmdt(address)
+            raise RuntimeError("XShmAttach failed")
+
+        self.shminfo = shminfo
+        self.ximage = ximage
+        self.size = size
+
+    def _release(self):
+        if self.ximage is None:
+            return
+        self.xext.XShmDetach(self.display, ctypes.byref(self.shminfo))
+        self.xlib.XSync(self.display, 0)
+        DESTROY_IMAGE(self.ximage.contents.destroy_image)(self.ximage)
+        self.libc.shmdt(self.shminfo.shmaddr)
+        self.ximage = None
+        self.shminfo = None
+        self.size = None
+
+    def grab_raw(self, bbox=None):
+        """Grab into the shared segment and return (size, buffer, stride) without copying
+
+        The buffer holds BGRX pixels and is overwritten by the next grab.
+        """
+        if bbox is None:
+            bbox = (0, 0) + self.screen_size
+        size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+        if size[0] <= 0 or size[1] <= 0:
+            raise ValueError("Capture area is empty")
+        if bbox[0] < 0 or bbox[1] < 0 or bbox[2] > self.screen_size[0] or bbox[3] > self.screen_size[1]:
+            raise ValueError("Capture area is outside the screen")
+        if size != self.size:
+            self._allocate(size)
+
+        if self._trapping_errors(self.xext.XShmGetImage, self.display, self.root_window, self.ximage,
+                                 bbox[0], bbox[1], self.ALL_PLANES):
+            raise RuntimeError("XShmGetImage failed")
+
+        stride = self.ximage.contents.bytes_per_line
+        buffer = (ctypes.c_char * (stride * size[1])).from_address(self.shminfo.shmaddr)
+        return size, buffer, stride
+
+    def grab(self, bbox=None):
+        size, buffer, stride = self.grab_raw(bbox)
+        return Image.frombuffer("RGB", size, buffer, "raw", "BGRX", stride, 1)
+
+    def grab_into(self, image, bbox):
+        size, buffer, stride = self.grab_raw(bbox)
+        # Single BGRX to RGB pass from the shared segment into the caller's frame
+        image.frombytes(buffer, "raw", "BGRX", stride, 1)
+
+    def virtual_screen(self):
+        return (0, 0) + self.screen_size
+
+    def close(self):
+        if self.display:
+            self._release()
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+
+class SyntheticBackend(CaptureBackend):
+    """Deterministic generated frames for benchmarking and testing without a display
+
+    Each grab returns the next frame of a fixed gradient with a moving
+    square, so consecutive frames differ and runs are reproducible.
+    """
+    name = "synthetic"
+
+    def __init__(self, screen=(0, 0, 1920, 1080), static=False):
+        self.screen = tuple(screen)
+        self.static = static
+        self.frame_index = 0
+
+        width, height = self.screen[2], self.screen[3]
+        red = Image.linear_gradient("L").resize((width, height))
+        green = red.transpose(Image.Transpose.ROTATE_90).resize((width, height))
+        blue = Image.new("L", (width, height), 96)
+        self.background = Image.merge("RGB", (red, green, blue))
+
+    def clone(self):
+        return SyntheticBackend(self.screen, self.static)
+
+    def grab(self, bbox=None):
+        x, y, width, height = self.screen
+        if bbox is None:
+            bbox = (x, y, x + width, y + height)
+
+        frame = Image.new("RGB", (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        self.grab_into(frame, bbox)
+        return frame
+
+    def grab_into(self, image, bbox):
+        x, y, width, height = self.screen
+        offset = (x - bbox[0], y - bbox[1])
+        image.paste(self.background, offset)
+        if not self.static:
+            # Square sweeps across the screen, one step per grab
+            side = max(16, min(width, height) // 8)
+            step = self.frame_index * side // 4
+            left = step % max(1, width - side) + offset[0]
+            top = (step // max(1, width - side) * side) % max(1, height - side) + offset[1]
+            shade = (self.frame_index * 37) % 256
+            ImageDraw.Draw(image).rectangle(
+                (left, top, left + side, top + side), fill=(255 - shade, shade, 255)
+            )
+        self.frame_index += 1
+
+    def virtual_screen(self):
+        return self.screen
+
+
+class GrabSession:
+    """Long-lived capture session that reuses frame buffers between grabs
+
+    Frames are handed out from a pool sized for the current capture area
+    and must be given back with release() once the caller is done with
+    them. New buffers are only allocated when the area size changes or
+    every pooled frame is still in use (the pool then grows to match),
+    so steady-state captures allocate nothing.
+    """
+
+    def __init__(self, backend, pool_size=2):
+        self.backend = backend
+        self.pool_size = pool_size
+        self.size = None
+        self.free = []
+        self.holds = {}
+        self.lock = threading.Lock()
+
+        # Allocation accounting
+        self.captures = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+        self.last_allocations = 0
+        self.last_bytes = 0
+
+    def _frame_for(self, size):
+        with self.lock:
+            if size != self.size:
+                # Area changed, frames of the old size are dropped
+                self.size = size
+                self.free = [Image.new("RGB", size) for _ in range(self.pool_size)]
+                self.allocations += self.pool_size
+                self.bytes_allocated += self.pool_size * size[0] * size[1] * 4
+            if self.free:
+                return self.free.pop()
+            self.allocations += 1
+            self.bytes_allocated += size[0] * size[1] * 4
+            return Image.new("RGB", size)
+
+    def grab(self, bbox):
+        """Capture bbox into a pooled frame and return it"""
+        allocations = self.allocations + self.backend.allocations
+        bytes_allocated = self.bytes_allocated + self.backend.bytes_allocated
+
+        frame = self._frame_for((bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        try:
+            self.backend.grab_into(frame, bbox)
+        except Exception:
+            self.release(frame)
+            raise
+
+        self.captures += 1
+        self.last_allocations = self.allocations + self.backend.allocations - allocations
+        self.last_bytes = self.bytes_allocated + self.backend.bytes_allocated - bytes_allocated
+        return frame
+
+    def retain(self, frame):
+        """Take an extra hold on frame for a second user, who gives it back with release() too"""
+        with self.lock:
+            self.holds[id(frame)] = self.holds.get(id(frame), 0) + 1
+
+    def release(self, frame):
+        """Return a frame to the pool once every holder has released it"""
+        with self.lock:
+            holds = self.holds.pop(id(frame), 0)
+            if holds > 1:
+                self.holds[id(frame)] = holds - 1
+            elif holds == 0 and frame.size == self.size:
+                self.free.append(frame)
+
+    def stats(self):
+        """Allocation counters for reporting"""
+        return {
+            "captures": self.captures,
+            "allocations": self.allocations + self.backend.allocations,
+            "bytes_allocated": self.bytes_allocated + self.backend.bytes_allocated,
+            "last_allocations": self.last_allocations,
+            "last_bytes": self.last_bytes
+        }
+
+    def set_backend(self, backend):
+        """Switch to another backend, keeping the frame pool"""
+        self.backend.close()
+        self.backend = backend
+
+    def close(self):
+        self.backend.close()
+        with self.lock:
+            self.free = []
+            self.size = None
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PillowBackend, XShmBackend, MssBackend, SyntheticBackend)
+}
+
+
+def measure_backend(backend, bbox=(0, 0, 256, 256), rounds=3):
+    """Return the best grab time of backend over a few rounds, in seconds"""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        backend.grab(bbox)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def detect_fastest_backend(bbox=(0, 0, 256, 256)):
+    """Measure every available screen backend and return the name of the fastest"""
+    timings = {}
+    for name, backend_class in BACKENDS.items():
+        if backend_class is SyntheticBackend or not backend_class.available():
+            continue
+        try:
+            backend = backend_class()
+            try:
+                timings[name] = measure_backend(backend, bbox)
+            finally:
+                backend.close()
+        except Exception as e:
+            print(f"Error measuring capture backend {name}: {e}")
+    if not timings:
+        return PillowBackend.name
+    return min(timings, key=timings.get)
+
+
+def create_backend(name="auto"):
+    """Create the named capture backend, measuring the available ones for "auto"
+
+    Unknown or unavailable backends fall back to Pillow.
+    """
+    if name == "auto":
+        name = detect_fastest_backend()
+    backend_class = BACKENDS.get(name)
+    if backend_class is None or not backend_class.available():
+        print(f"Capture backend {name} is not available, using Pillow")
+        backend_class = PillowBackend
+    try:
+        return backend_class()
+    except Exception as e:
+        print(f"Error starting capture backend {name}: {e}")
+        return PillowBackend()
+
+
+if __name__ == "__main__":
+    # Quick benchmark of every backend that runs here
+    area = (0, 0, 1920, 1080)
+    for name, backend_class in BACKENDS.items():
+        if not backend_class.available():
+            print(f"{name}: not available")
+            continue
+        try:
+            backend = backend_class()
+            print(f"{name}: {measure_backend(backend, area, rounds=10) * 1000:.1f} ms per {area[2]}x{area[3]} grab")
+            backend.close()
+        except Exception as e:
+            print(f"{name}: error {e}")
@@ -0,0 +1,267 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+INDEX_FILE = "screenshot_index.db"
+
+# Extensions the encoders write, see encoders.py
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    x INTEGER,
+    y INTEGER,
+    width INTEGER,
+    height INTEGER,
+    monitor TEXT,
+    bytes INTEGER NOT NULL,
+    mtime REAL,
+    encode_ms REAL,
+    write_ms REAL,
+    pixel_hash TEXT,
+    duplicate_of TEXT
+);
+CREATE INDEX IF NOT EXISTS captures_by_folder ON captures (folder, captured_at);
+CREATE INDEX IF NOT EXISTS captures_by_hash ON captures (pixel_hash);
+"""
+
+COLUMNS = ("path", "folder", "captured_at", "x", "y", "width", "height", "monitor", "bytes",
+           "mtime", "encode_ms", "write_ms", "pixel_hash", "duplicate_of")
+
+
+def capture_time(path, mtime):
+    """Capture time from a screenshot_/burst_/replay_ timestamp in the filename, else mtime"""
+    parts = os.path.splitext(os.path.basename(path))[0].split("_")
+    if len(parts) >= 3:
+        try:
+            return datetime.strptime(f"{parts[1]}_{parts[2]}", "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return mtime
+
+
+def scan_file(path, hash_pixels=False):
+    """Index row for an existing capture, read from the file itself"""
+    from PIL import Image
+    stat = os.stat(path)
+    row = dict.fromkeys(COLUMNS)
+    row.update(path=path, folder=os.path.dirname(path), captured_at=capture_time(path, stat.st_mtime),
+               bytes=stat.st_size, mtime=stat.st_mtime)
+    with Image.open(path) as image:
+        row["width"], row["height"] = image.size
+        if hash_pixels:
+            from dedup import DedupIndex
+            image = image.convert("RGB")
+            row["pixel_hash"] = DedupIndex.hash_image(image)
+    return row
+
+
+class CaptureIndex:
+    """SQLite index of every saved capture
+
+    The save pipeline adds a row per written file, so questions like the
+    latest captures in a folder or the bytes used per folder are answered
+    from the index instead of by listing directories. Folders are stored
+    as absolute directory paths. One connection is shared by all threads
+    behind a lock; writes are small and the database runs in WAL mode, so
+    readers are not blocked by the save workers. rebuild() brings the
+    index back in line with what is on disk.
+    """
+
+    def __init__(self, path=INDEX_FILE, layout=None):
+        self.path = path
+        self.layout = layout
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _upsert(self, rows):
+        with self.lock:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO captures ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join(':' + column for column in COLUMNS)})",
+                rows
+            )
+            self.connection.commit()
+
+    def add(self, job):
+        """Record a finished save job"""
+        row = dict.fromkeys(COLUMNS)
+        row.update(path=os.path.abspath(job.filename), folder=os.path.abspath(job.folder),
+                   captured_at=job.captured_at, encode_ms=job.encode_time * 1000, write_ms=job.write_time * 1000,
+                   pixel_hash=job.pixel_hash, duplicate_of=job.duplicate_of)
+        self._set_region(row, job.bbox)
+        try:
+            stat = os.stat(row["path"])
+            row["bytes"] = job.bytes_written or stat.st_size
+            row["mtime"] = stat.st_mtime
+        except OSError:
+            row["bytes"] = job.bytes_written
+        self._upsert([row])
+
+    def add_file(self, path, bbox=None):
+        """Record a capture that was written without a save job, read from the file"""
+        row = scan_file(os.path.abspath(path))
+        self._set_region(row, bbox)
+        self._upsert([row])
+
+    def _set_region(self, row, bbox):
+        if not bbox:
+            return
+        x, y = bbox[0], bbox[1]
+        row.update(x=x, y=y, width=bbox[2] - x, height=bbox[3] - y)
+        monitor = self.layout.monitor_at((x + bbox[2]) // 2, (y + bbox[3]) // 2) if self.layout else None
+        row["monitor"] = monitor.name if monitor else None
+
+    def update_file(self, path):
+        """Refresh the size and modification time of an indexed file that was rewritten"""
+        stat = os.stat(path)
+        with self.lock:
+            self.connection.execute(
+                "UPDATE captures SET bytes = ?, mtime = ? WHERE path = ?",
+                (stat.st_size, stat.st_mtime, os.path.abspath(path))
+            )
+            self.connection.commit()
+
+    def _query(self, sql, parameters=()):
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def recent(self, folder=None, limit=50):
+        """Latest captures, newest first, optionally only those in folder"""
+        if folder is None:
+            return self._query("SELECT * FROM captures ORDER BY captured_at DESC LIMIT ?", (limit,))
+        return self._query("SELECT * FROM captures WHERE folder = ? ORDER BY captured_at DESC LIMIT ?",
+                           (os.path.abspath(folder), limit))
+
+    def count(self, folder):
+        """Number of captures in folder"""
+        rows = self._query("SELECT COUNT(*) AS count FROM captures WHERE folder = ?", (os.path.abspath(folder),))
+        return rows[0]["count"]
+
+    def page(self, folder, offset, limit):
+        """Paths of captures in folder, newest first, from offset on"""
+        rows = self._query(
+            "SELECT path FROM captures WHERE folder = ? ORDER BY captured_at DESC LIMIT ? OFFSET ?",
+            (os.path.abspath(folder), limit, offset)
+        )
+        return [row["path"] for row in rows]
+
+    def folder_totals(self):
+        """Capture count and bytes per folder, largest first
+
+        Duplicates hard linked to an earlier capture take no extra space,
+        so they are counted but their bytes are not.
+        """
+        return self._query(
+            "SELECT folder, COUNT(*) AS captures, SUM(CASE WHEN duplicate_of IS NULL THEN bytes ELSE 0 END) AS bytes "
+            "FROM captures GROUP BY folder ORDER BY bytes DESC"
+        )
+
+    def find_hash(self, pixel_hash):
+        """Paths of captures with the same pixels"""
+        return [row["path"] for row in self._query("SELECT path FROM captures WHERE pixel_hash = ?", (pixel_hash,))]
+
+    def _store_scanned(self, rows, known):
+        """Add scanned files, or refresh what a rescan can tell about ones already in the index
+
+        A row the save pipeline wrote since the rebuild started keeps its
+        region, timings and duplicate link, the scan only updates the
+        size, time, dimensions and hash.
+        """
+        with self.lock:
+            self.connection.executemany(
+                f"INSERT INTO captures ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join(':' + column for column in COLUMNS)}) "
+                "ON CONFLICT (path) DO UPDATE SET bytes = excluded.bytes, mtime = excluded.mtime, "
+                "width = excluded.width, height = excluded.height, "
+                "pixel_hash = COALESCE(excluded.pixel_hash, pixel_hash)",
+                rows
+            )
+            self.connection.commit()
+        new = sum(1 for row in rows if row["path"] not in known)
+        return new, len(rows) - new
+
+    def rebuild(self, folders, workers=4, hash_pixels=False):
+        """Rescan folders, adding files the index misses and dropping rows for files that are gone
+
+        Files whose size and modification time still match their row are
+        not opened again, unless hash_pixels is set and the row has no
+        pixel hash yet. The remaining files are read on workers threads.
+        Rows of files that changed only get their size, time, dimensions
+        and hash refreshed, the region and timings from the save are kept.
+        Returns counts of the files added, updated, removed and unchanged,
+        and the ones that could not be read.
+        """
+        start = time.perf_counter()
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "failed": 0}
+        folders = [os.path.abspath(folder) for folder in folders]
+        known = {}
+        hashed = set()
+        for folder in folders:
+            for row in self._query("SELECT path, bytes, mtime, pixel_hash FROM captures WHERE folder = ?", (folder,)):
+                known[row["path"]] = (row["bytes"], row["mtime"])
+                if row["pixel_hash"]:
+                    hashed.add(row["path"])
+
+        def listing(folder):
+            try:
+                with os.scandir(folder) as entries:
+                    return [(entry.path, entry.stat()) for entry in entries
+                            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)]
+            except FileNotFoundError:
+                return []
+
+        def scan(path):
+            try:
+                return scan_file(path, hash_pixels)
+            except Exception as e:
+                print(f"Error indexing {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            found = {}
+            for files in pool.map(listing, folders):
+                found.update(files)
+            changed = [path for path, stat in found.items()
+                       if known.get(path) != (stat.st_size, stat.st_mtime) or (hash_pixels and path not in hashed)]
+            stats["unchanged"] = len(found) - len(changed)
+            rows = []
+            for row in pool.map(scan, changed):
+                if row is None:
+                    stats["failed"] += 1
+                    continue
+                rows.append(row)
+                # Keep the lock free for the save workers during long rebuilds
+                if len(rows) >= 500:
+                    added, updated = self._store_scanned(rows, known)
+                    stats["added"] += added
+                    stats["updated"] += updated
+                    rows = []
+            added, updated = self._store_scanned(rows, known)
+            stats["added"] += added
+            stats["updated"] += updated
+
+        missing = [(path,) for path in known if path not in found]
+        with self.lock:
+            self.connection.executemany("DELETE FROM captures WHERE path = ?", missing)
+            self.connection.commit()
+        stats["removed"] = len(missing)
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from PIL import ImageChops
+from capture_backends import GrabSession
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ChangeWatcher:
+    """Watch one area and save a full capture only when enough of it changes
+
+    Each sample is reduced by scale and compared in greyscale against the
+    sample taken at the last save. When the fraction of pixels differing by
+    more than tolerance passes threshold, a save is pending. It fires once
+    the area has been stable for debounce seconds (or has kept changing for
+    max_wait seconds), never more often than max_rate saves per second. The
+    full-resolution frame that triggered is the one saved, so no extra grab
+    is needed. Sampling slows down as needed to keep its share of one core
+    within cpu_budget.
+    """
+
+    def __init__(self, backend, bbox, folder, pipeline, encoder=None, threshold=0.01, fps=4, scale=8,
+                 tolerance=16, debounce=0.5, max_rate=1.0, cpu_budget=0.1):
+        self.backend = backend
+        self.bbox = bbox
+        self.folder = folder
+        self.pipeline = pipeline
+        self.encoder = encoder
+        self.threshold = threshold
+        self.fps = fps
+        self.scale = scale
+        self.tolerance = tolerance
+        self.debounce = debounce
+        self.min_interval = 1.0 / max_rate
+        self.max_wait = max(debounce * 4, self.min_interval)
+        self.cpu_budget = cpu_budget
+
+        # Counters
+        self.samples = 0
+        self.saves = 0
+        self.skipped = 0
+        self.last_fraction = 0.0
+        self.cpu_share = 0.0
+        self.error = None
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch, name="change-watch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.thread = None
+
+    def set_target(self, bbox, folder):
+        """Follow a new area or folder from the next sample on"""
+        with self.lock:
+            self.bbox = bbox
+            self.folder = folder
+
+    def reduce(self, frame):
+        """Small greyscale copy of frame used for comparisons"""
+        return frame.reduce(self.scale).convert("L") if self.scale > 1 else frame.convert("L")
+
+    def changed_fraction(self, sample, reference):
+        """Fraction of pixels that differ by more than tolerance"""
+        if reference is None or sample.size != reference.size:
+            return 1.0
+        if numpy is not None:
+            difference = numpy.abs(numpy.asarray(sample, dtype=numpy.int16) - numpy.asarray(reference, dtype=numpy.int16))
+            return float(numpy.count_nonzero(difference > self.tolerance)) / difference.size
+        histogram = ImageChops.difference(sample, reference).histogram()
+        return sum(histogram[self.tolerance + 1:]) / (sample.width * sample.height)
+
+    def _watch(self):
+        session = GrabSession(self.backend.clone())
+        reference = None
+        previous = None
+        pending_since = None
+        last_change = 0.0
+        last_save = 0.0
+        try:
+            while not self.stop_event.is_set():
+                work_start = time.thread_time()
+                wall_start = time.perf_counter()
+                with self.lock:
+                    bbox, folder = self.bbox, self.folder
+
+                frame = session.grab(bbox)
+                sample = self.reduce(frame)
+                self.samples += 1
+                self.last_fraction = self.changed_fraction(sample, reference)
+                now = time.perf_counter()
+
+                if self.last_fraction >= self.threshold:
+                    if pending_since is None:
+                        pending_since = now
+                    if self.changed_fraction(sample, previous) >= self.threshold:
+                        last_change = now
+                else:
+                    pending_since = None
+                previous = sample
+
+                settled = False
+                if pending_since is not None:
+                    settled = now - last_change >= self.debounce or now - pending_since >= self.max_wait
+                if settled and now - last_save >= self.min_interval:
+                    try:
+                        self.pipeline.submit(frame, folder, release=session.release, encoder=self.encoder, bbox=bbox)
+                        self.saves += 1
+                        reference = sample
+                        pending_since = None
+                        last_save = now
+                    except queue.Full:
+                        # Try again on the next sample
+                        session.release(frame)
+                        self.skipped += 1
+                else:
+                    session.release(frame)
+
+                # Sleep long enough to keep within the CPU budget. Only the CPU time of this
+                # thread counts, not time spent waiting on the display server or for the GIL
+                work = time.thread_time() - work_start
+                elapsed = time.perf_counter() - wall_start
+                interval = max(1.0 / self.fps, work / self.cpu_budget)
+                self.cpu_share = work / max(interval, elapsed)
+                self.stop_event.wait(max(0.0, interval - elapsed))
+        except Exception as e:
+            self.error = e
+        finally:
+            session.close()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class DedupIndex:
+    """Persistent per-folder index of pixel hashes used to skip identical captures
+
+    Each folder keeps an append-only INDEX_FILE of hash/file pairs, so
+    deduplication survives restarts without rewriting the index. In "skip"
+    mode a duplicate is not written at all; in "hardlink" mode it is
+    written as a hard link to the earlier file, falling back to a normal
+    write where links are not supported.
+    """
+    INDEX_FILE = ".screenshot_hashes.jsonl"
+    MODES = ("off", "skip", "hardlink")
+
+    def __init__(self, mode="skip"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        self.mode = mode
+        self.folders = {}
+        # (folder, hash) claimed by a capture that is still being written, to its Event
+        self.writing = {}
+        self.lock = threading.Lock()
+
+        # Counters since start
+        self.duplicates = 0
+        self.bytes_saved = 0
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    @staticmethod
+    def hash_image(image):
+        """Hash of the raw pixels, mode and size of image"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.width}x{image.height}".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def _load(self, folder):
+        """Hash to filename map for folder, read from its index file on first use"""
+        if folder in self.folders:
+            return self.folders[folder]
+        hashes = {}
+        try:
+            with open(os.path.join(folder, self.INDEX_FILE), 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        hashes[entry["hash"]] = os.path.join(folder, entry["file"])
+                    except (ValueError, KeyError):
+                        # Skip a line cut short by a crash
+                        continue
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading dedup index for {folder}: {e}")
+        self.folders[folder] = hashes
+        return hashes
+
+    def claim(self, folder, pixel_hash):
+        """Existing file in folder with the same pixels, or None if the caller is to write it
+
+        Returning None claims the hash: identical captures that come in
+        meanwhile wait here until the caller reports the file with add(),
+        or gives up with abandon(), instead of being written as well.
+        """
+        key = (folder, pixel_hash)
+        while True:
+            with self.lock:
+                writing = self.writing.get(key)
+                if writing is None:
+                    filename = self._load(folder).get(pixel_hash)
+                    if filename and os.path.exists(filename):
+                        return filename
+                    self.writing[key] = threading.Event()
+                    return None
+            writing.wait()
+
+    def abandon(self, folder, pixel_hash):
+        """Give up a claim from claim() without writing the file"""
+        with self.lock:
+            writing = self.writing.pop((folder, pixel_hash), None)
+        if writing:
+            writing.set()
+
+    def add(self, folder, pixel_hash, filename):
+        """Record a newly written file, ending its claim"""
+        with self.lock:
+            self._load(folder)[pixel_hash] = filename
+            writing = self.writing.pop((folder, pixel_hash), None)
+            if writing:
+                writing.set()
+            try:
+                with open(os.path.join(folder, self.INDEX_FILE), 'a') as f:
+                    f.write(json.dumps({"hash": pixel_hash, "file": os.path.basename(filename)}) + "\n")
+            except Exception as e:
+                print(f"Error updating dedup index for {folder}: {e}")
+
+    def reuse(self, filename, original):
+        """Stand in for writing filename, whose pixels match original
+
+        Returns the path the capture now lives at, or None if it still has
+        to be written normally.
+        """
+        if self.mode == "hardlink":
+            # Keep the original's extension, it may have been saved in another format
+            linked = os.path.splitext(filename)[0] + os.path.splitext(original)[1]
+            try:
+                os.link(original, linked)
+            except OSError:
+                return None
+            result = linked
+        else:
+            result = original
+        with self.lock:
+            self.duplicates += 1
+            self.bytes_saved += os.path.getsize(original)
+        return result
@@ -0,0 +1,296 @@
+import io
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from PIL import Image
+
+
+# zlib strategies accepted by Pillow's PNG writer as compress_type
+PNG_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED
+}
+
+# Named encoder settings, usable anywhere an encoder config is expected
+PRESETS = {
+    "png": {"format": "png"},
+    "png-fast": {"format": "png", "compress_level": 1},
+    "png-rle": {"format": "png", "compress_level": 6, "strategy": "rle"},
+    "png-small": {"format": "png", "compress_level": 9},
+    "png-adaptive": {"format": "png-adaptive", "budget_ms": 50},
+    "webp-lossless": {"format": "webp-lossless", "method": 4},
+    "webp-lossless-fast": {"format": "webp-lossless", "method": 0, "quality": 0},
+    "webp": {"format": "webp", "quality": 90},
+    "jpeg": {"format": "jpeg", "quality": 90},
+    "tiff": {"format": "tiff"},
+    "bmp": {"format": "bmp"},
+    "auto": {"format": "auto"}
+}
+
+
+class Encoder:
+    """Encode images to one file format with fixed options"""
+
+    def __init__(self, name, image_format, extension, **options):
+        self.name = name
+        self.image_format = image_format
+        self.extension = extension
+        self.options = options
+
+    def encode(self, image):
+        """Return the encoded image as a bytes-like object"""
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.image_format, **self.options)
+        return buffer.getbuffer()
+
+    def resolve(self, pending=0):
+        """Concrete encoder to use for the next image, given the save queue depth"""
+        return self
+
+    def record(self, image, encoder, seconds, size, filename):
+        """Called by the save workers after every image saved through this encoder"""
+        pass
+
+    def idle(self, changed=None):
+        """Do one piece of background work while the save workers are idle
+
+        changed(filename) is called for every saved file the work rewrote.
+        Returns True if there was work to do.
+        """
+        return False
+
+
+class AutoEncoder(Encoder):
+    """Pick the lossless encoder with the best size/time tradeoff from measured timings
+
+    A crop of a recent capture is encoded with every candidate. The smallest
+    output whose encode speed stays within max_ms_per_mp wins; if none is
+    fast enough the fastest one is used. Calibration runs on the save
+    workers after the first capture and again every recalibrate_every
+    captures, so the choice follows the kind of content being captured.
+    """
+    CANDIDATES = ("png-fast", "png", "png-rle", "png-small", "webp-lossless-fast", "webp-lossless")
+
+    def __init__(self, max_ms_per_mp=40, recalibrate_every=200, sample_size=512):
+        self.name = "auto"
+        self.max_ms_per_mp = max_ms_per_mp
+        self.recalibrate_every = recalibrate_every
+        self.sample_size = sample_size
+
+        self.candidates = [create_encoder(name) for name in self.CANDIDATES]
+        self.choice = self.candidates[1]
+        self.timings = {}
+        self.encoded = 0
+        self.calibrated = False
+        self.lock = threading.Lock()
+
+    @property
+    def extension(self):
+        return self.choice.extension
+
+    def encode(self, image):
+        return self.choice.encode(image)
+
+    def resolve(self, pending=0):
+        return self.choice
+
+    def record(self, image, encoder, seconds, size, filename):
+        self.encoded += 1
+        due = not self.calibrated or self.encoded % self.recalibrate_every == 0
+        # Only one worker calibrates at a time, the others carry on saving
+        if due and self.lock.acquire(blocking=False):
+            try:
+                self.calibrate(image)
+            finally:
+                self.lock.release()
+
+    def calibrate(self, image):
+        """Measure every candidate on a crop of image and update the choice"""
+        width, height = image.size
+        side_x = min(width, self.sample_size)
+        side_y = min(height, self.sample_size)
+        left = (width - side_x) // 2
+        top = (height - side_y) // 2
+        sample = image.crop((left, top, left + side_x, top + side_y))
+        megapixels = max(side_x * side_y, 1) / 1000000
+
+        timings = {}
+        for candidate in self.candidates:
+            start = time.perf_counter()
+            size = len(candidate.encode(sample))
+            elapsed = time.perf_counter() - start
+            timings[candidate.name] = (elapsed * 1000 / megapixels, size)
+
+        fast_enough = [c for c in self.candidates if timings[c.name][0] <= self.max_ms_per_mp]
+        if fast_enough:
+            self.choice = min(fast_enough, key=lambda c: timings[c.name][1])
+        else:
+            self.choice = min(self.candidates, key=lambda c: timings[c.name][0])
+        self.timings = timings
+        self.calibrated = True
+
+
+class AdaptivePngEncoder(Encoder):
+    """PNG encoder that adjusts zlib settings to stay within a per-capture latency budget
+
+    Encode speed is tracked per rung of a ladder of zlib settings, from
+    fastest to smallest output. Each capture uses the smallest-output rung
+    whose predicted latency, counting the captures queued ahead of it, fits
+    budget_ms. Saved files are remembered and re-compressed at maximum
+    compression while the save workers are idle. Files with more than one
+    link are left alone, replacing them would undo deduplication.
+    """
+    LADDER = (
+        ("huffman", 1),
+        ("rle", 1),
+        ("default", 1),
+        ("default", 3),
+        ("default", 6),
+        ("default", 9)
+    )
+    # Relative encode cost of each rung, used until a rung has been measured
+    PRIOR_COST = (0.3, 0.4, 0.5, 0.7, 1.0, 2.5)
+
+    def __init__(self, budget_ms=50, recompress=True, max_backlog=10000):
+        self.name = "png-adaptive"
+        self.extension = ".png"
+        self.budget = budget_ms / 1000
+        self.recompress = recompress
+
+        self.rungs = [
+            create_encoder({"format": "png", "compress_level": level, "strategy": strategy})
+            for strategy, level in self.LADDER
+        ]
+        self.archive = create_encoder({"format": "png", "compress_level": 9, "optimize": True})
+        self.cost = [None] * len(self.rungs)
+        self.megapixels = None
+        self.rung = 4
+        self.lock = threading.Lock()
+
+        # Files waiting for idle re-compression
+        self.backlog = deque(maxlen=max_backlog)
+        self.recompressed = 0
+        self.bytes_saved = 0
+
+    def encode(self, image):
+        return self.rungs[self.rung].encode(image)
+
+    def estimate(self, rung):
+        """Seconds per megapixel for rung, scaled from the nearest measured rung if needed"""
+        if self.cost[rung] is not None:
+            return self.cost[rung]
+        measured = [(index, cost) for index, cost in enumerate(self.cost) if cost is not None]
+        if not measured:
+            return None
+        index, cost = min(measured, key=lambda item: abs(item[0] - rung))
+        return cost * self.PRIOR_COST[rung] / self.PRIOR_COST[index]
+
+    def resolve(self, pending=0):
+        with self.lock:
+            if self.megapixels is None:
+                return self.rungs[self.rung]
+            chosen = 0
+            for rung in range(len(self.rungs)):
+                if self.estimate(rung) * self.megapixels * (pending + 1) <= self.budget:
+                    chosen = rung
+            self.rung = chosen
+            return self.rungs[chosen]
+
+    def record(self, image, encoder, seconds, size, filename):
+        megapixels = max(image.width * image.height, 1) / 1000000
+        rung = self.rungs.index(encoder)
+        with self.lock:
+            per_megapixel = seconds / megapixels
+            previous = self.cost[rung]
+            self.cost[rung] = per_megapixel if previous is None else 0.7 * previous + 0.3 * per_megapixel
+            self.megapixels = megapixels
+        if self.recompress:
+            self.backlog.append(filename)
+
+    def idle(self, changed=None):
+        try:
+            filename = self.backlog.popleft()
+        except IndexError:
+            return False
+        try:
+            before = os.stat(filename)
+            if before.st_nlink > 1:
+                return True
+            with Image.open(filename) as image:
+                data = self.archive.encode(image)
+            if len(data) < before.st_size:
+                temp_name = filename + ".part"
+                with open(temp_name, 'wb') as f:
+                    f.write(data)
+                # Keep the capture time so folder listings stay in order
+                os.utime(temp_name, ns=(before.st_atime_ns, before.st_mtime_ns))
+                current = os.stat(filename)
+                if current.st_nlink > 1 or current.st_size != before.st_size:
+                    # Linked to or rewritten while encoding
+                    os.remove(temp_name)
+                    return True
+                os.replace(temp_name, filename)
+                self.bytes_saved += before.st_size - len(data)
+                if changed:
+                    changed(filename)
+            self.recompressed += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error re-compressing {filename}: {e}")
+        return True
+
+
+def create_encoder(config="png"):
+    """Build an encoder from a preset name or a config dict with a "format" key
+
+    Supported formats: png (compress_level, optimize, strategy), webp-lossless
+    (method, quality), webp and jpeg (quality), tiff and bmp (uncompressed),
+    auto (max_ms_per_mp, recalibrate_every, sample_size) and png-adaptive
+    (budget_ms, recompress).
+    """
+    if isinstance(config, str):
+        if config not in PRESETS:
+            raise ValueError(f"Unknown encoder: {config}")
+        name = config
+        config = PRESETS[config]
+    else:
+        name = config.get("name", config.get("format", "png"))
+    options = {key: value for key, value in config.items() if key not in ("format", "name")}
+    image_format = config.get("format", "png")
+
+    if image_format == "auto":
+        return AutoEncoder(**options)
+    if image_format == "png-adaptive":
+        return AdaptivePngEncoder(**options)
+    if image_format == "png":
+        strategy = options.pop("strategy", "default")
+        if strategy not in PNG_STRATEGIES:
+            raise ValueError(f"Unknown PNG strategy: {strategy}")
+        return Encoder(
+            name, "PNG", ".png",
+            compress_level=options.get("compress_level", 6),
+            optimize=options.get("optimize", False),
+            compress_type=PNG_STRATEGIES[strategy]
+        )
+    if image_format == "webp-lossless":
+        return Encoder(
+            name, "WEBP", ".webp",
+            lossless=True,
+            quality=options.get("quality", 80),
+            method=options.get("method", 4)
+        )
+    if image_format == "webp":
+        return Encoder(name, "WEBP", ".webp", quality=options.get("quality", 90), method=options.get("method", 4))
+    if image_format == "jpeg":
+        return Encoder(name, "JPEG", ".jpg", quality=options.get("quality", 90))
+    if image_format == "tiff":
+        return Encoder(name, "TIFF", ".tiff", compression="raw")
+    if image_format == "bmp":
+        return Encoder(name, "BMP", ".bmp")
+    raise ValueError(f"Unknown encoder format: {image_format}")
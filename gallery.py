@@ -0,0 +1,187 @@
+import collections
+import os
+import time
+import tkinter as tk
+
+
+class GalleryView:
+    """Scrollable grid of capture thumbnails that only creates widgets for what is on screen
+
+    The canvas scroll region is sized for every capture, but only the
+    cells of the visible rows exist: a small pool of canvas items is moved
+    and refilled as the view scrolls, so a folder with tens of thousands of
+    captures costs no more than a screenful. Paths are fetched a page at a
+    time through fetch(offset, limit), newest first. Thumbnails come from
+    a ThumbnailCache and the PhotoImages of the most recently shown ones
+    are kept in memory, up to max_photos.
+    """
+    CAPTION_HEIGHT = 18
+    PADDING = 6
+    PAGE = 200
+    POLL_INTERVAL = 30
+
+    def __init__(self, parent, thumbnails, on_open=None, max_photos=300):
+        self.thumbnails = thumbnails
+        self.on_open = on_open
+        self.max_photos = max_photos
+        self.cell_width = thumbnails.size[0] + self.PADDING * 2
+        self.cell_height = thumbnails.size[1] + self.CAPTION_HEIGHT + self.PADDING
+
+        self.frame = tk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_view_changed)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.canvas.bind("<Configure>", lambda event: self.schedule_refresh())
+        self.canvas.bind("<Button-1>", self.on_click)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self.on_wheel)
+
+        self.count = 0
+        self.fetch = None
+        self.pages = {}
+        self.columns = 0
+        # Pool of (image item, caption item), one per visible cell
+        self.cells = []
+        # Visible path to its cell
+        self.visible = {}
+        # Path to PhotoImage, least recently shown first
+        self.photos = collections.OrderedDict()
+        self.refresh_id = None
+        self.poll_id = None
+
+        # Counters
+        self.refreshes = 0
+        self.last_refresh_time = 0.0
+
+    def load(self, count, fetch, keep_position=False):
+        """Show count captures, fetched through fetch(offset, limit)"""
+        self.count = count
+        self.fetch = fetch
+        self.pages = {}
+        self.columns = 0
+        if not keep_position:
+            self.canvas.yview_moveto(0)
+        self.schedule_refresh()
+
+    def start(self):
+        if self.poll_id is None:
+            self.poll_id = self.canvas.after(self.POLL_INTERVAL, self.poll)
+
+    def stop(self):
+        """Stop polling for thumbnails, while the gallery is not shown"""
+        if self.poll_id is not None:
+            self.canvas.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.thumbnails.request([])
+
+    def path_at(self, index):
+        page, offset = divmod(index, self.PAGE)
+        if page not in self.pages:
+            self.pages[page] = self.fetch(page * self.PAGE, self.PAGE) if self.fetch else []
+        paths = self.pages[page]
+        return paths[offset] if offset < len(paths) else None
+
+    def on_view_changed(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_refresh()
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-1, "units")
+        else:
+            self.canvas.yview_scroll(1, "units")
+
+    def on_click(self, event):
+        column = int(self.canvas.canvasx(event.x) // self.cell_width)
+        row = int(self.canvas.canvasy(event.y) // self.cell_height)
+        if column >= self.columns:
+            return
+        index = row * self.columns + column
+        path = self.path_at(index) if index < self.count else None
+        if path and self.on_open:
+            self.on_open(path)
+
+    def schedule_refresh(self):
+        # Scrolling reports every step, lay out at most once per idle pass
+        if self.refresh_id is None:
+            self.refresh_id = self.canvas.after_idle(self.refresh)
+
+    def refresh(self):
+        """Fill the cells of the visible rows"""
+        start = time.perf_counter()
+        self.refresh_id = None
+        columns = max(1, self.canvas.winfo_width() // self.cell_width)
+        if columns != self.columns:
+            self.columns = columns
+            rows = -(-self.count // columns)
+            self.canvas.configure(
+                scrollregion=(0, 0, columns * self.cell_width, rows * self.cell_height),
+                yscrollincrement=self.cell_height // 3
+            )
+
+        top = self.canvas.canvasy(0)
+        first_row = int(top // self.cell_height)
+        last_row = int((top + self.canvas.winfo_height()) // self.cell_height)
+        first = min(self.count, first_row * columns)
+        last = min(self.count, (last_row + 1) * columns)
+
+        while len(self.cells) < last - first:
+            self.cells.append((
+                self.canvas.create_image(0, 0, anchor=tk.NW),
+                self.canvas.create_text(0, 0, anchor=tk.N, font=("TkDefaultFont", 8))
+            ))
+
+        self.visible = {}
+        missing = []
+        for cell, index in zip(self.cells, range(first, last)):
+            image_item, caption_item = cell
+            path = self.path_at(index)
+            row, column = divmod(index, columns)
+            x = column * self.cell_width + self.PADDING
+            y = row * self.cell_height + self.PADDING
+            self.canvas.coords(image_item, x, y)
+            self.canvas.coords(caption_item, x + self.thumbnails.size[0] // 2, y + self.thumbnails.size[1] + 2)
+            self.canvas.itemconfigure(caption_item, text=self.caption(path), state=tk.NORMAL)
+            photo = self.photos.get(path)
+            if photo is not None:
+                self.photos.move_to_end(path)
+            elif path:
+                missing.append(path)
+            self.canvas.itemconfigure(image_item, image=photo or "", state=tk.NORMAL)
+            if path:
+                self.visible[path] = cell
+        for image_item, caption_item in self.cells[max(0, last - first):]:
+            self.canvas.itemconfigure(image_item, image="", state=tk.HIDDEN)
+            self.canvas.itemconfigure(caption_item, state=tk.HIDDEN)
+
+        self.thumbnails.request(missing)
+        self.refreshes += 1
+        self.last_refresh_time = time.perf_counter() - start
+
+    def caption(self, path):
+        """File name, shortened to fit under the thumbnail"""
+        if not path:
+            return ""
+        name = os.path.splitext(os.path.basename(path))[0]
+        limit = self.cell_width // 6
+        return name if len(name) <= limit else "…" + name[-(limit - 1):]
+
+    def poll(self):
+        """Show thumbnails the cache has finished"""
+        self.poll_id = self.canvas.after(self.POLL_INTERVAL, self.poll)
+        results = self.thumbnails.poll()
+        if not results:
+            return
+        from PIL import ImageTk
+        for path, image in results:
+            photo = ImageTk.PhotoImage(image)
+            self.photos[path] = photo
+            self.photos.move_to_end(path)
+            cell = self.visible.get(path)
+            if cell:
+                self.canvas.itemconfigure(cell[0], image=photo)
+        # Keep at least the visible thumbnails
+        while len(self.photos) > max(self.max_photos, len(self.visible)):
+            self.photos.popitem(last=False)
@@ -0,0 +1,121 @@
+import threading
+import time
+
+
+def fit(image, max_size, background):
+    """image fitted into max_size and centred on a background of exactly max_size
+
+    First uses Image.reduce by the largest whole factor that leaves at
+    least twice the target size, a cheap box filter, and then one LANCZOS
+    pass down to the final size. Images in other modes, such as palette
+    GIFs and PNGs, are converted to RGB first.
+    """
+    from PIL import Image
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    max_width, max_height = max_size
+    ratio = min(max_width / image.width, max_height / image.height, 1.0)
+    size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+    if size != image.size:
+        factor = int(1 / ratio / 2)
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    result = Image.new("RGB", max_size, background)
+    result.paste(image, ((max_width - size[0]) // 2, (max_height - size[1]) // 2))
+    return result
+
+
+class PreviewRenderer:
+    """Scale captures down for the preview on a background thread
+
+    Only the newest image is kept. Submitting while an earlier image is
+    still waiting replaces it, and an unread result is replaced by the
+    next one, so during bursts stale frames are dropped instead of piling
+    up. Scaling is done by fit(), which centres the result on a background
+    of exactly max_size, so the Tk side can paste it into one PhotoImage
+    that never changes size.
+    """
+
+    def __init__(self, max_size=(380, 300), background=(217, 217, 217)):
+        self.max_size = max_size
+        self.background = background
+        self.condition = threading.Condition()
+        self.pending = None
+        self.result = None
+        self.busy = False
+        self.stopped = False
+        self.thread = None
+
+        # Counters
+        self.rendered = 0
+        self.dropped = 0
+        self.last_render_time = 0.0
+
+    def submit(self, image, release=None, label=None):
+        """Queue image for scaling; release(image) is called once the renderer is done with it"""
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="preview", daemon=True)
+                self.thread.start()
+            dropped = self.pending
+            self.pending = (image, release, label, time.perf_counter())
+            self.condition.notify()
+        if dropped:
+            self.dropped += 1
+            self._release(dropped)
+
+    @property
+    def waiting(self):
+        """True while a submitted image has not been collected by poll() yet"""
+        with self.condition:
+            return self.busy or self.pending is not None or self.result is not None
+
+    def poll(self):
+        """The newest finished preview as (image, label, submitted_at), or None"""
+        with self.condition:
+            result = self.result
+            self.result = None
+        return result
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def scale(self, image):
+        """image fitted into max_size and centred on the background"""
+        return fit(image, self.max_size, self.background)
+
+    def _release(self, request):
+        image, release = request[0], request[1]
+        if release:
+            release(image)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                request = self.pending
+                self.pending = None
+                self.busy = True
+            image, release, label, submitted_at = request
+            try:
+                start = time.perf_counter()
+                preview = self.scale(image)
+                self.last_render_time = time.perf_counter() - start
+                self.rendered += 1
+            except Exception as e:
+                print(f"Error rendering preview: {e}")
+                preview = None
+            finally:
+                self._release(request)
+            with self.condition:
+                if preview is not None:
+                    if self.result is not None:
+                        self.dropped += 1
+                    self.result = (preview, label, submitted_at)
+                self.busy = False
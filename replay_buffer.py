@@ -0,0 +1,239 @@
+import io
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from PIL import Image
+
+
+class ReplayFrame:
+    """One lightly compressed frame of the replay buffer"""
+
+    def __init__(self, captured_at, size, data, bbox=None):
+        self.captured_at = captured_at
+        self.size = size
+        self.data = data
+        # Screen area the frame was grabbed from, it can change between frames
+        self.bbox = bbox
+
+    def decode(self):
+        return Image.frombytes("RGB", self.size, zlib.decompress(self.data))
+
+
+class ReplayDump:
+    """Progress of writing the last seconds of a replay buffer to disk"""
+
+    def __init__(self):
+        self.paths = []
+        self.jobs = []
+        self.frames = 0
+        self.error = None
+        self.written = threading.Event()
+
+    @property
+    def finished(self):
+        return self.written.is_set() and all(job.done for job in self.jobs)
+
+
+class ReplayBuffer:
+    """Continuously sample one area at low fps, keeping a memory-bounded history
+
+    Frames are stored as zlib-compressed raw pixels. History is capped by
+    max_bytes and max_seconds. When the byte cap is hit the eviction policy
+    either drops the oldest frame ("oldest") or thins the older half of the
+    history to every other frame ("thin"), which keeps a longer span at a
+    lower frame rate.
+    """
+
+    EVICTION_POLICIES = ("oldest", "thin")
+    ANIMATION_FORMATS = {"apng": ("PNG", ".png"), "gif": ("GIF", ".gif"), "webp": ("WEBP", ".webp")}
+
+    def __init__(self, backend, bbox, fps=1, max_bytes=256 * 1024 * 1024, max_seconds=60,
+                 eviction="oldest", compress_level=1):
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.backend = backend
+        self.bbox = bbox
+        self.fps = fps
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.eviction = eviction
+        self.compress_level = compress_level
+
+        self.frames = deque()
+        self.total_bytes = 0
+        self.evicted = 0
+        self.error = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start sampling in the background"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sample, name="replay-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling, the history is kept until cleared"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.thread = None
+
+    def set_bbox(self, bbox):
+        """Follow a new capture area from the next sample on"""
+        with self.lock:
+            self.bbox = bbox
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.total_bytes = 0
+
+    def _sample(self):
+        backend = self.backend.clone()
+        frame = None
+        interval = 1.0 / self.fps
+        next_sample = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                with self.lock:
+                    bbox = self.bbox
+                size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+                if frame is None or frame.size != size:
+                    frame = Image.new("RGB", size)
+
+                backend.grab_into(frame, bbox)
+                data = zlib.compress(frame.tobytes(), self.compress_level)
+                self._append(ReplayFrame(time.time(), size, data, bbox))
+
+                # Fixed schedule, skipping missed slots rather than catching up
+                next_sample += interval
+                now = time.perf_counter()
+                if next_sample < now:
+                    next_sample = now
+                self.stop_event.wait(next_sample - now)
+        except Exception as e:
+            self.error = e
+        finally:
+            backend.close()
+
+    def _append(self, frame):
+        with self.lock:
+            self.frames.append(frame)
+            self.total_bytes += len(frame.data)
+
+            cutoff = frame.captured_at - self.max_seconds
+            while self.frames and self.frames[0].captured_at < cutoff:
+                self._drop(0)
+
+            while self.total_bytes > self.max_bytes and len(self.frames) > 1:
+                if self.eviction == "thin" and len(self.frames) >= 4:
+                    # Drop every other frame from the older half
+                    for index in range(len(self.frames) // 2 - 1, 0, -2):
+                        self._drop(index)
+                        if self.total_bytes <= self.max_bytes:
+                            break
+                else:
+                    self._drop(0)
+
+    def _drop(self, index):
+        frame = self.frames[index]
+        del self.frames[index]
+        self.total_bytes -= len(frame.data)
+        self.evicted += 1
+
+    def last_frames(self, seconds):
+        """Frames captured within the last seconds, oldest first"""
+        cutoff = time.time() - seconds
+        with self.lock:
+            return [frame for frame in self.frames if frame.captured_at >= cutoff]
+
+    def stats(self):
+        with self.lock:
+            span = self.frames[-1].captured_at - self.frames[0].captured_at if self.frames else 0.0
+            return {
+                "frames": len(self.frames),
+                "bytes": self.total_bytes,
+                "seconds": span,
+                "evicted": self.evicted
+            }
+
+    def dump(self, seconds, folder, pipeline, fmt="png", encoder=None):
+        """Write the last seconds to folder in the background and return a ReplayDump
+
+        "png" queues every frame on the save pipeline as its own file, in
+        encoder's format (the pipeline's default if not given); the
+        animation formats write one file directly, with a filename reserved
+        on the pipeline and a row in its index.
+        """
+        dump = ReplayDump()
+        frames = self.last_frames(seconds)
+        dump.frames = len(frames)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        def write():
+            try:
+                if fmt == "png":
+                    for index, frame in enumerate(frames):
+                        job = pipeline.submit(
+                            frame.decode(),
+                            folder,
+                            timeout=None,
+                            name=f"replay_{stamp}_{index + 1:04d}",
+                            encoder=encoder,
+                            bbox=frame.bbox
+                        )
+                        dump.jobs.append(job)
+                        dump.paths.append(job.filename)
+                elif frames:
+                    dump.paths.append(self._write_animation(frames, folder, f"replay_{stamp}", fmt, pipeline))
+            except Exception as e:
+                dump.error = e
+            finally:
+                dump.written.set()
+
+        threading.Thread(target=write, name="replay-dump", daemon=True).start()
+        return dump
+
+    def _write_animation(self, frames, folder, name, fmt, pipeline):
+        if fmt not in self.ANIMATION_FORMATS:
+            raise ValueError(f"Unknown replay format: {fmt}")
+        image_format, extension = self.ANIMATION_FORMATS[fmt]
+
+        # Frames are only the same size if the area did not change during sampling
+        size = frames[-1].size
+        frames = [frame for frame in frames if frame.size == size]
+        durations = [
+            max(20, int((later.captured_at - earlier.captured_at) * 1000))
+            for earlier, later in zip(frames, frames[1:])
+        ]
+        durations.append(durations[-1] if durations else int(1000 / self.fps))
+
+        first = frames[0].decode()
+        options = {"save_all": True, "append_images": (frame.decode() for frame in frames[1:]),
+                   "duration": durations, "loop": 0}
+        if fmt == "webp":
+            options["lossless"] = True
+
+        buffer = io.BytesIO()
+        first.save(buffer, format=image_format, **options)
+
+        os.makedirs(folder, exist_ok=True)
+        # Reserved like the pipeline's own files, so two dumps in the same second both survive
+        filename = pipeline.reserve_filename(folder, name, extension)
+        try:
+            with open(filename + ".part", 'wb') as f:
+                f.write(buffer.getbuffer())
+            os.replace(filename + ".part", filename)
+        finally:
+            pipeline.release_filename(filename)
+        pipeline.record_file(filename, frames[-1].bbox)
+        return filename
@@ -0,0 +1,261 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from dedup import DedupIndex
+from encoders import create_encoder
+
+
+class SaveJob:
+    """A grabbed image waiting to be encoded and written to disk"""
+
+    def __init__(self, image, folder, filename, encoder, source_encoder, release=None, bbox=None):
+        self.image = image
+        self.encoder = encoder
+        self.source_encoder = source_encoder
+        self.release = release
+        self.folder = folder
+        self.filename = filename
+        # Screen bounding box the image was grabbed from, if known
+        self.bbox = bbox
+        self.captured_at = time.time()
+        self.submitted_at = time.perf_counter()
+        self.grab_time = 0.0
+
+        # Filled in by the worker
+        self.finished = threading.Event()
+        self.done = False
+        self.error = None
+        self.pixel_hash = None
+        self.duplicate_of = None
+        self.bytes_written = 0
+        self.encode_time = 0.0
+        self.write_time = 0.0
+        self.queue_time = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def wait(self, timeout=None):
+        """Wait until the job has been written or failed, return False on timeout"""
+        return self.finished.wait(timeout)
+
+
+class SavePipeline:
+    """Pool of worker threads that encode and write screenshots off the UI thread
+
+    Workers that find the queue empty for IDLE_DELAY seconds give the
+    encoders in use a chance to do background work, one item at a time.
+    Every file written is recorded in index, a CaptureIndex, if given.
+    """
+    IDLE_DELAY = 0.5
+
+    def __init__(self, workers=2, max_queue=8, encoder=None, dedup=None, keep_results=True, index=None):
+        self.default_encoder = encoder or create_encoder("png")
+        self.dedup = dedup
+        self.index = index
+        # Callers that wait on jobs directly can skip the results queue
+        self.keep_results = keep_results
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.results = queue.Queue()
+        self.workers = []
+        self.worker_count = max(1, workers)
+
+        # Filenames handed out but not yet written, so back-to-back captures never collide
+        self.reserved = set()
+        self.lock = threading.Lock()
+
+        # Encoders that have been used, for idle work
+        self.encoders_seen = set()
+        self.idle_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads"""
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self._worker, name=f"save-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def reserve_filename(self, folder, name=None, extension=".png"):
+        """Pick a unique filename in folder, based on name or the current time"""
+        if name is None:
+            name = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        with self.lock:
+            filename = os.path.join(folder, f"{name}{extension}")
+            counter = 2
+            while filename in self.reserved or os.path.exists(filename):
+                filename = os.path.join(folder, f"{name}_{counter}{extension}")
+                counter += 1
+            self.reserved.add(filename)
+        return filename
+
+    def submit(self, image, folder, timeout=0, release=None, name=None, encoder=None, bbox=None):
+        """Queue an image for saving and return its job
+
+        encoder defaults to the pipeline's encoder. release, if given, is
+        called with the image once it has been encoded. bbox is the screen
+        area the image came from, for the index. Raises queue.Full if
+        the queue stays full for longer than timeout seconds; a timeout of
+        None waits for as long as it takes.
+        """
+        source_encoder = encoder or self.default_encoder
+        self.encoders_seen.add(source_encoder)
+        concrete = source_encoder.resolve(self.pending())
+        filename = self.reserve_filename(folder, name, concrete.extension)
+        job = SaveJob(image, folder, filename, concrete, source_encoder, release, bbox)
+        try:
+            if timeout is None:
+                self.jobs.put(job)
+            elif timeout:
+                self.jobs.put(job, timeout=timeout)
+            else:
+                self.jobs.put_nowait(job)
+        except queue.Full:
+            self.release_filename(job.filename)
+            raise
+        return job
+
+    def pending(self):
+        """Number of jobs waiting for a worker"""
+        return self.jobs.qsize()
+
+    def poll(self):
+        """Return all jobs finished since the last call"""
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def shutdown(self, wait=True):
+        """Stop the workers, letting queued jobs finish first when wait is set"""
+        if wait:
+            self.jobs.join()
+        for _ in self.workers:
+            self.jobs.put(None)
+        if wait:
+            for worker in self.workers:
+                worker.join()
+        self.workers = []
+
+    def release_filename(self, filename):
+        """Give back a filename from reserve_filename() that was written or given up"""
+        with self.lock:
+            self.reserved.discard(filename)
+
+    def _release_image(self, job):
+        if job.image is not None and job.release:
+            job.release(job.image)
+        job.image = None
+
+    def _idle(self):
+        # One worker at a time, the rest keep waiting for jobs
+        if not self.idle_lock.acquire(blocking=False):
+            return
+        try:
+            for encoder in list(self.encoders_seen):
+                if encoder.idle(self._file_changed):
+                    return
+        finally:
+            self.idle_lock.release()
+
+    def _worker(self):
+        while True:
+            try:
+                job = self.jobs.get(timeout=self.IDLE_DELAY)
+            except queue.Empty:
+                self._idle()
+                continue
+            if job is None:
+                self.jobs.task_done()
+                return
+            try:
+                self._save(job)
+                self._add_to_index(job)
+            except Exception as e:
+                job.error = e
+            finally:
+                self._release_image(job)
+                self.release_filename(job.filename)
+                job.done = True
+                job.finished.set()
+                if self.keep_results:
+                    self.results.put(job)
+                self.jobs.task_done()
+
+    def record_file(self, filename, bbox=None):
+        """Add a file written outside the pipeline, like a replay animation, to the index"""
+        if self.index is None:
+            return
+        try:
+            self.index.add_file(filename, bbox)
+        except Exception as e:
+            print(f"Error updating capture index: {e}")
+
+    def _file_changed(self, filename):
+        # Rewritten after saving, e.g. re-compressed by an encoder
+        if self.index is None:
+            return
+        try:
+            self.index.update_file(filename)
+        except Exception as e:
+            print(f"Error updating capture index: {e}")
+
+    def _add_to_index(self, job):
+        # A skipped duplicate wrote no file of its own
+        if self.index is None or job.filename == job.duplicate_of:
+            return
+        try:
+            self.index.add(job)
+        except Exception as e:
+            print(f"Error updating capture index: {e}")
+
+    def _save(self, job):
+        """Encode the image in memory, then write it with a rename so no partial file is left behind"""
+        job.queue_time = time.perf_counter() - job.submitted_at
+
+        deduplicate = self.dedup and self.dedup.enabled
+        if deduplicate or self.index is not None:
+            job.pixel_hash = DedupIndex.hash_image(job.image)
+        claimed = False
+        if deduplicate:
+            # Claimed before encoding, so identical captures on other workers wait for this one
+            original = self.dedup.claim(job.folder, job.pixel_hash)
+            claimed = original is None
+            if original:
+                reused = self.dedup.reuse(job.filename, original)
+                if reused:
+                    self.release_filename(job.filename)
+                    job.duplicate_of = original
+                    job.filename = reused
+                    return
+
+        try:
+            start = time.perf_counter()
+            data = job.encoder.encode(job.image)
+            job.encode_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            os.makedirs(job.folder, exist_ok=True)
+            temp_name = job.filename + ".part"
+            try:
+                with open(temp_name, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_name, job.filename)
+            except Exception:
+                if os.path.exists(temp_name):
+                    os.remove(temp_name)
+                raise
+        except Exception:
+            if claimed:
+                self.dedup.abandon(job.folder, job.pixel_hash)
+            raise
+        if deduplicate:
+            self.dedup.add(job.folder, job.pixel_hash, job.filename)
+        job.bytes_written = len(data)
+        job.write_time = time.perf_counter() - start
+        job.source_encoder.record(job.image, job.encoder, job.encode_time, job.bytes_written, job.filename)
+        self._release_image(job)
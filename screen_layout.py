@@ -0,0 +1,154 @@
+import collections
+import ctypes
+import ctypes.util
+import sys
+import threading
+import time
+
+
+# Geometry of one monitor in screen coordinates
+Monitor = collections.namedtuple("Monitor", "x y width height name primary")
+
+_xlib = None
+
+
+def query_monitors():
+    """Monitors reported by the optional screeninfo package, or [] if it is not available"""
+    try:
+        import screeninfo
+    except ImportError:
+        return []
+    try:
+        return [
+            Monitor(m.x, m.y, m.width, m.height, m.name, bool(getattr(m, "is_primary", False)))
+            for m in screeninfo.get_monitors()
+        ]
+    except Exception as e:
+        print(f"Error getting monitor info: {e}")
+        return []
+
+
+def _x11_desktop():
+    """Root window size from a fresh X connection, which always reflects the current configuration"""
+    global _xlib
+    if _xlib is None:
+        path = ctypes.util.find_library("X11")
+        if not path:
+            return None
+        xlib = ctypes.CDLL(path)
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        xlib.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        _xlib = xlib
+    display = _xlib.XOpenDisplay(None)
+    if not display:
+        return None
+    try:
+        screen = _xlib.XDefaultScreen(display)
+        return (0, 0, _xlib.XDisplayWidth(display, screen), _xlib.XDisplayHeight(display, screen))
+    finally:
+        _xlib.XCloseDisplay(display)
+
+
+def system_desktop():
+    """(x, y, width, height) of the whole desktop as the window system reports it, or None
+
+    Only reads metrics the window system already keeps, so it is cheap
+    enough to call before every capture.
+    """
+    try:
+        if sys.platform == "win32":
+            metrics = ctypes.windll.user32.GetSystemMetrics
+            # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN
+            return (metrics(76), metrics(77), metrics(78), metrics(79))
+        if sys.platform.startswith("linux") or "bsd" in sys.platform:
+            return _x11_desktop()
+    except Exception as e:
+        print(f"Error reading the desktop size: {e}")
+    return None
+
+
+def bounds(monitors):
+    """(x, y, width, height) of the area covering every monitor"""
+    min_x = min(m.x for m in monitors)
+    min_y = min(m.y for m in monitors)
+    max_x = max(m.x + m.width for m in monitors)
+    max_y = max(m.y + m.height for m in monitors)
+    return (min_x, min_y, max_x - min_x, max_y - min_y)
+
+
+class MonitorLayout:
+    """Cached monitor layout that follows monitors being added, removed or moved
+
+    The monitors are queried once and then kept. check() compares the
+    desktop size reported by the window system against the one seen at the
+    last query and only queries again when it differs, when the cache is
+    older than max_age (which catches rearrangements that keep the size),
+    or after invalidate(), for use from configure or display-change events.
+    Without screeninfo the whole desktop is treated as one monitor, sized by
+    the backend, the window system or fallback; pixels are never grabbed
+    just to measure the screen.
+    """
+
+    def __init__(self, backend=None, fallback=None, max_age=10.0):
+        self.backend = backend
+        self.fallback = fallback
+        self.max_age = max_age
+        self.monitors = []
+        self.virtual_screen = None
+        self.signature = None
+        self.refreshed_at = None
+        self.refreshes = 0
+        self.lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Query the monitors now, returning True if the layout changed"""
+        signature = system_desktop()
+        monitors = query_monitors()
+        if monitors:
+            virtual_screen = bounds(monitors)
+        else:
+            virtual_screen = (self.backend.virtual_screen() if self.backend else None) or signature or self.fallback
+            if virtual_screen is None:
+                raise RuntimeError("Could not determine the screen size")
+            monitors = [Monitor(*virtual_screen, "desktop", True)]
+
+        with self.lock:
+            changed = monitors != self.monitors
+            self.monitors = monitors
+            self.virtual_screen = tuple(virtual_screen)
+            self.signature = signature
+            self.refreshed_at = time.monotonic()
+            self.refreshes += 1
+        return changed
+
+    def check(self):
+        """Refresh if the screen configuration may have changed, returning True if the layout did"""
+        if self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.max_age:
+            return self.refresh()
+        signature = system_desktop()
+        if signature is not None and signature != self.signature:
+            return self.refresh()
+        return False
+
+    def invalidate(self):
+        """Make the next check() query the monitors again"""
+        self.refreshed_at = None
+
+    def monitor_at(self, x, y):
+        """Monitor containing the screen point, or None"""
+        for monitor in self.monitors:
+            if monitor.x <= x < monitor.x + monitor.width and monitor.y <= y < monitor.y + monitor.height:
+                return monitor
+        return None
+
+
+def area_to_bbox(area, virtual_screen):
+    """Screen bounding box of an (x, y, width, height) area relative to the virtual screen"""
+    x = area[0] + virtual_screen[0]
+    y = area[1] + virtual_screen[1]
+    return (x, y, x + area[2], y + area[3])
@@ -0,0 +1,171 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Deliberately no tkinter or ImageTk here, so automation starts fast without a GUI
+import settings_store
+from capture_api import CaptureSession
+from capture_index import CaptureIndex
+
+
+def parse_area(value):
+    """Parse "x,y,w,h" into a tuple of ints"""
+    try:
+        area = tuple(int(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("area must be four whole numbers: x,y,w,h")
+    if len(area) != 4 or area[2] <= 0 or area[3] <= 0:
+        raise argparse.ArgumentTypeError("area must be x,y,w,h with a positive width and height")
+    return area
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Screenshot Tool command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    capture = commands.add_parser("capture", help="Capture an area without starting the GUI")
+    capture.add_argument("--area", type=parse_area,
+                         help="x,y,w,h relative to the virtual screen, like the main window (default: everything)")
+    capture.add_argument("--folder", default="", help="Folder name under the master folder")
+    capture.add_argument("--format", help="Encoder preset, defaults to the folder's format from the settings")
+    capture.add_argument("--backend", help="Capture backend, defaults to the one from the settings")
+    capture.add_argument("--repeat", type=int, default=1, help="Number of captures")
+    capture.add_argument("--interval", type=float, default=1.0, help="Seconds between captures")
+    capture.add_argument("--settings", default=settings_store.SETTINGS_FILE, help="Settings file")
+
+    index = commands.add_parser("index", help="Query or rebuild the capture index")
+    index.add_argument("action", choices=("recent", "totals", "rebuild"),
+                       help="recent: latest captures, totals: captures and bytes per folder, "
+                            "rebuild: rescan folders and repair the index")
+    index.add_argument("--folder", action="append",
+                       help="Folder name under the master folder, may be repeated (default: every folder)")
+    index.add_argument("--limit", type=int, default=50, help="Number of captures for recent")
+    index.add_argument("--workers", type=int, default=4, help="Threads reading files during a rebuild")
+    index.add_argument("--hash", action="store_true", help="Also hash the pixels of rescanned files and of indexed files without a hash")
+    index.add_argument("--settings", default=settings_store.SETTINGS_FILE, help="Settings file")
+    return parser
+
+
+def job_record(job, startup_time):
+    """JSON-serialisable summary of a finished save job"""
+    record = {
+        "path": job.filename,
+        "bytes": job.bytes_written,
+        "timings_ms": {
+            "startup": round(startup_time * 1000, 2),
+            "grab": round(job.grab_time * 1000, 2),
+            "queue": round(job.queue_time * 1000, 2),
+            "encode": round(job.encode_time * 1000, 2),
+            "write": round(job.write_time * 1000, 2)
+        }
+    }
+    if job.duplicate_of:
+        record["duplicate_of"] = job.duplicate_of
+    if not job.ok:
+        record["error"] = str(job.error)
+    return record
+
+
+def capture(args, out):
+    """Run the capture command, writing one JSON line per capture to out"""
+    start = time.perf_counter()
+    failures = 0
+
+    def write(record):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    settings = settings_store.load_settings(args.settings)
+    try:
+        session = CaptureSession(settings, backend=args.backend, encoder=args.format)
+    except Exception as e:
+        write({"error": str(e), "time": datetime.now().isoformat()})
+        return 1
+
+    with session:
+        startup_time = time.perf_counter() - start
+        area = args.area or (0, 0, session.virtual_screen[2], session.virtual_screen[3])
+
+        pending = []
+        for index in range(max(1, args.repeat)):
+            if index:
+                # Keep a fixed schedule from the first capture
+                time.sleep(max(0.0, start + startup_time + index * args.interval - time.perf_counter()))
+            try:
+                pending.append(session.capture_to_file(area, args.folder, wait=False))
+            except Exception as e:
+                failures += 1
+                write({"error": str(e), "time": datetime.now().isoformat()})
+
+            # Report finished captures in order
+            while pending and pending[0].done:
+                job = pending.pop(0)
+                failures += 0 if job.ok else 1
+                write(job_record(job, startup_time))
+
+    for job in pending:
+        failures += 0 if job.ok else 1
+        write(job_record(job, startup_time))
+    return 1 if failures else 0
+
+
+def capture_folders(settings):
+    """The master folder and every folder in it"""
+    master = settings_store.folder_path(settings, "")
+    folders = [master]
+    try:
+        with os.scandir(master or ".") as entries:
+            folders += [entry.path for entry in entries if entry.is_dir() and not entry.name.startswith(".")]
+    except FileNotFoundError:
+        pass
+    return folders
+
+
+def index(args, out):
+    """Run the index command, writing one JSON line per result to out"""
+    settings = settings_store.load_settings(args.settings)
+    if not settings["capture_index_file"]:
+        out.write(json.dumps({"error": "capture_index_file is not set"}) + "\n")
+        return 1
+    folders = [settings_store.folder_path(settings, name) for name in args.folder or ()]
+
+    capture_index = CaptureIndex(settings["capture_index_file"])
+    try:
+        if args.action == "recent":
+            records = []
+            for folder in folders or [None]:
+                records += capture_index.recent(folder, args.limit)
+            records.sort(key=lambda record: record["captured_at"], reverse=True)
+            records = records[:args.limit]
+        elif args.action == "totals":
+            records = capture_index.folder_totals()
+            if folders:
+                wanted = {os.path.abspath(folder) for folder in folders}
+                records = [record for record in records if record["folder"] in wanted]
+        else:
+            records = [capture_index.rebuild(folders or capture_folders(settings), args.workers, args.hash)]
+    finally:
+        capture_index.close()
+    for record in records:
+        out.write(json.dumps(record) + "\n")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Library code reports problems with print, keep those off the JSON output
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.command == "capture":
+            return capture(args, out)
+        if args.command == "index":
+            return index(args, out)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,120 +1,312 @@
+import time
+# Taken before anything else is imported, so the startup profile covers module loading
+STARTUP_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import json
-import time
-from PIL import ImageGrab, ImageTk
+import threading
 from datetime import datetime
-import screeninfo
+import queue
+# Pillow, the capture backends and the encoders are imported where they are
+# first used, or by the warm-up thread once the window is on screen
+from dedup import DedupIndex
+import settings_store
+from screen_layout import MonitorLayout, area_to_bbox
+from startup_profile import StartupProfiler
+from selection_overlay import SelectionOverlay
+from preview import PreviewRenderer
 
 class ScreenshotTool:
-    SETTINGS_FILE = "screenshot_settings.json"
+    SETTINGS_FILE = settings_store.SETTINGS_FILE
+    
+    # Bounds for the learned delay used when no unmap event confirms the hide
+    MIN_HIDE_DELAY = 0.03
+    MAX_HIDE_DELAY = 0.2
+    # Extra space around the window for its title bar and borders
+    WINDOW_FRAME_MARGIN = 40
+    # Launch to first paint of the main window
+    STARTUP_BUDGET = 0.15
+    # Modules that must not be loaded before the main window has painted
+    DEFERRED_MODULES = ("PIL.Image", "PIL.ImageTk", "capture_backends", "save_pipeline",
+                        "capture_index", "gallery", "encoders", "numpy", "screeninfo")
     
-    def __init__(self, root):
+    def __init__(self, root, profiler=None):
         self.root = root
+        self.profiler = profiler or StartupProfiler()
         self.root.title("Screenshot Tool")
         
-        # Default settings
-        self.settings = {
-            "master_folder": "",
-            "window_geometry": None,
-            "window_state": {}
-        }
+        self.settings = {}
         self.selected_area = None
-        self.last_screenshot = None
+        # Previews are scaled on their own thread and pasted into one PhotoImage
+        self.previews = PreviewRenderer()
+        self.preview_photo = None
+        self.preview_check_id = None
+        self.preview_latency = None
         
         # Notification variables
         self.notification = None
         self.notification_id = None
         
         # Load settings
-        self.load_settings()
+        with self.profiler.phase("load settings"):
+            self.load_settings()
         
-        # UI state storage
-        self.ui_state = {
-            "folder_name": "",
-            "coordinates": [0, 0, 0, 0]
-        }
+        # UI state, kept in Tk variables so it survives switching screens
+        self.folder_var = tk.StringVar(self.root)
+        self.coord_vars = [tk.StringVar(self.root, value="0") for _ in range(4)]
+        self.main_screen = None
+        self.settings_screen = None
+        self.gallery_screen = None
+        self.gallery = None
+        self.thumbnails = None
+        self.gallery_folder = None
+        # Set by the rescan thread once the index matches the folder on disk
+        self.gallery_rescanned = threading.Event()
         
-        # Selection variables
-        self.selection_active = False
-        self.selection_started = False  # Track if we've started drawing the selection
-        self.crosshair_lines = []
-        self.coord_label = None
-        self.virtual_screen = self.get_virtual_screen()
+        # Area selection window, built once after startup and reused
+        self.overlay = SelectionOverlay(
+            self.root,
+            self.on_area_selected,
+            self.cancel_selection,
+            per_monitor=self.settings["selection_per_monitor"],
+            loupe=self.settings["selection_loupe"],
+            debug=self.settings["debug_overlay"]
+        )
         
-        # Main GUI elements
-        self.create_main_gui()
+        # Filled in by the warm-up thread, see the properties below
+        self.warmup_done = threading.Event()
+        self.warmup_thread = None
+        self.backend_name = self.settings["capture_backend"]
+        self._capture_session = None
+        self._layout = None
+        # Used as the screen size if neither screeninfo nor the window system can tell
+        self.screen_fallback = (0, 0, self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+        self._save_pipeline = None
+        self.capture_index = None
+        self.exit_code = 0
+        
+        # Capture state
+        self.capture_in_progress = False
+        self.capture_timing = {}
+        self.burst = None
+        self.replay = None
+        self.watcher = None
+        self.encoders = {}
+        self.hide_confirmed_at = None
+        self.hide_latency = None
+        self.root.bind("<Unmap>", self.on_root_unmap, add="+")
         
-    def get_virtual_screen(self):
-        """Get the combined dimensions of all monitors"""
+        self.dedup = DedupIndex(self.settings["dedup_mode"])
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         try:
-            monitors = screeninfo.get_monitors()
-            if not monitors:
-                width, height = ImageGrab.grab().size
-                return (0, 0, width, height)
-            
-            min_x = min(m.x for m in monitors)
-            min_y = min(m.y for m in monitors)
-            max_x = max(m.x + m.width for m in monitors)
-            max_y = max(m.y + m.height for m in monitors)
-            return (min_x, min_y, max_x - min_x, max_y - min_y)
+            self.root.bind(self.settings["replay_hotkey"], self.save_replay)
+        except tk.TclError as e:
+            print(f"Error binding replay hotkey: {e}")
+        
+        # Main GUI elements
+        with self.profiler.phase("build main window"):
+            self.create_main_gui()
+        self.root.bind("<Expose>", self.on_first_paint, add="+")
+        # In case the window manager never exposes the window
+        self.root.after(500, self.start_warm_up)
+        self.root.after(100, self.process_save_results)
+        self.root.after(100, self.prepare_overlay)
+    
+    def on_first_paint(self, event):
+        """Start the deferred work once the window has been drawn"""
+        if self.warmup_thread is None:
+            self.profiler.mark("first paint")
+            self.start_warm_up()
+    
+    def start_warm_up(self):
+        if self.warmup_thread is None:
+            self.warmup_thread = threading.Thread(target=self.warm_up, name="warm-up", daemon=True)
+            self.warmup_thread.start()
+    
+    def warm_up(self):
+        """Load the imaging modules and probe the system while the window is already up"""
+        profiler = self.profiler
+        try:
+            with profiler.phase("import Pillow"):
+                from PIL import Image, ImageTk  # noqa: F401
+            with profiler.phase("import capture and save modules"):
+                import capture_backends
+                import save_pipeline  # noqa: F401
+            if self.backend_name == "auto":
+                with profiler.phase("choose capture backend"):
+                    self.backend_name = capture_backends.detect_fastest_backend()
+            with profiler.phase("query monitors"):
+                self._layout = MonitorLayout(fallback=self.screen_fallback)
+            with profiler.phase("start save workers"):
+                self._save_pipeline = self.create_save_pipeline()
         except Exception as e:
-            print(f"Error getting monitor info: {e}")
-            width, height = ImageGrab.grab().size
-            return (0, 0, width, height)
+            print(f"Error warming up: {e}")
+        finally:
+            self.warmup_done.set()
+    
+    def wait_for_warm_up(self):
+        """Block until the warm-up thread has finished, starting it if needed"""
+        self.start_warm_up()
+        self.warmup_done.wait()
+    
+    def create_save_pipeline(self):
+        """Start the background encode/save workers"""
+        from save_pipeline import SavePipeline
+        if self.settings["capture_index_file"]:
+            from capture_index import CaptureIndex
+            try:
+                self.capture_index = CaptureIndex(self.settings["capture_index_file"], self._layout)
+            except Exception as e:
+                print(f"Error opening capture index: {e}")
+        pipeline = SavePipeline(
+            workers=self.settings["save_workers"],
+            max_queue=self.settings["save_queue_size"],
+            dedup=self.dedup,
+            index=self.capture_index
+        )
+        pipeline.start()
+        return pipeline
+    
+    @property
+    def capture_session(self):
+        """Long-lived capture session, reuses its connection and frame buffers between captures"""
+        if self._capture_session is None:
+            from capture_backends import GrabSession, create_backend
+            self.wait_for_warm_up()
+            self._capture_session = GrabSession(create_backend(self.backend_name))
+        return self._capture_session
+    
+    @property
+    def layout(self):
+        """Cached monitor layout, see check_layout"""
+        self.wait_for_warm_up()
+        if self._layout is None:
+            self._layout = MonitorLayout(fallback=self.screen_fallback)
+        return self._layout
+    
+    @property
+    def virtual_screen(self):
+        return self.layout.virtual_screen
+    
+    @property
+    def save_pipeline(self):
+        self.wait_for_warm_up()
+        if self._save_pipeline is None:
+            self._save_pipeline = self.create_save_pipeline()
+        return self._save_pipeline
+    
+    def report_startup(self, check=False):
+        """Print the startup profile once warm-up has finished
+        
+        With check, close the tool afterwards with exit code 1 if the window
+        painted later than STARTUP_BUDGET or deferred modules were loaded
+        before it did.
+        """
+        if not self.warmup_done.is_set():
+            self.root.after(20, lambda: self.report_startup(check))
+            return
+        print(self.profiler.report())
+        painted = self.profiler.marks.get("first paint")
+        early = self.profiler.loaded_by("first paint", self.DEFERRED_MODULES)
+        if painted is None:
+            print("The window was never painted")
+        else:
+            print(f"First paint after {painted * 1000:.1f} ms (budget {self.STARTUP_BUDGET * 1000:.0f} ms)")
+        if early:
+            print(f"Loaded before first paint: {', '.join(early)}")
+        if check:
+            if painted is None or painted > self.STARTUP_BUDGET or early:
+                self.exit_code = 1
+            self.on_close()
+    
+    def stress_screens(self, count):
+        """Switch between the main and settings screens count times and close
+        
+        Prints the widget count, Tcl command count and memory use before
+        and after; exit code 1 if widgets or commands were left behind.
+        """
+        if not self.warmup_done.is_set():
+            self.root.after(20, lambda: self.stress_screens(count))
+            return
+        
+        def usage():
+            self.root.update()
+            widgets = 0
+            stack = [self.root]
+            while stack:
+                widget = stack.pop()
+                widgets += 1
+                stack.extend(widget.winfo_children())
+            commands = len(self.root.tk.splitlist(self.root.tk.call("info", "commands")))
+            try:
+                import resource
+                memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            except ImportError:
+                memory = None
+            return widgets, commands, memory
+        
+        # The first switch builds the settings screen, measure from there
+        self.show_settings()
+        self.return_to_main()
+        before = usage()
+        start = time.perf_counter()
+        for _ in range(count):
+            self.show_settings()
+            self.root.update()
+            self.return_to_main()
+            self.root.update()
+        elapsed = time.perf_counter() - start
+        after = usage()
+        
+        print(f"{count} screen switches in {elapsed * 1000:.0f} ms ({elapsed / max(1, count) * 1000:.2f} ms each)")
+        print(f"Widgets: {before[0]} -> {after[0]}")
+        print(f"Tcl commands: {before[1]} -> {after[1]}")
+        if before[2] is not None:
+            print(f"Peak memory: {before[2]} -> {after[2]} KB")
+        if after[0] > before[0] or after[1] > before[1]:
+            self.exit_code = 1
+        self.on_close()
+    
+    def check_layout(self):
+        """Pick up monitors that were added, removed or rearranged since the last check"""
+        if self.layout.check():
+            self.follow_selection()
 
     def load_settings(self):
         """Load settings from JSON file"""
-        try:
-            if os.path.exists(self.SETTINGS_FILE):
-                with open(self.SETTINGS_FILE, 'r') as f:
-                    loaded_settings = json.load(f)
-                    self.settings.update(loaded_settings)
-        except Exception as e:
-            print(f"Error loading settings: {e}")
+        self.store = settings_store.SettingsStore(self.SETTINGS_FILE)
+        self.settings = self.store.settings
 
     def save_settings(self):
-        """Save settings to JSON file"""
-        try:
-            with open(self.SETTINGS_FILE, 'w') as f:
-                json.dump(self.settings, f, indent=4)
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+        """Save settings to JSON file if they changed, shortly afterwards and off the Tk thread"""
+        self.store.save()
 
     def save_ui_state(self):
         """Save current UI state"""
-        if hasattr(self, 'folder_entry'):
-            self.ui_state["folder_name"] = self.folder_entry.get()
-        if hasattr(self, 'coord_vars') and self.coord_vars:
-            self.ui_state["coordinates"] = [var.get() for var in self.coord_vars]
+        if self.selected_area:
+            self.follow_selection()
         
         self.settings["window_geometry"] = self.root.geometry()
         self.save_settings()
 
-    def restore_ui_state(self):
-        """Restore UI state"""
-        if hasattr(self, 'folder_entry'):
-            self.folder_entry.delete(0, tk.END)
-            self.folder_entry.insert(0, self.ui_state["folder_name"])
-        if hasattr(self, 'coord_vars') and self.coord_vars and self.selected_area:
-            for i, var in enumerate(self.coord_vars):
-                var.set(str(self.ui_state["coordinates"][i]))
-
     def create_main_gui(self):
-        """Create the main application interface"""
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        """Create the main application interface, built once and shown with show_main_screen"""
+        # Notification area (persistent), shared by both screens
+        self.notification_frame = tk.Frame(self.root, height=30)
+        self.notification_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+        self.notification_label = tk.Label(self.notification_frame, text="", height=1)
+        self.notification_label.pack(fill=tk.X)
         
         # Main container frame
-        main_frame = tk.Frame(self.root, padx=20, pady=20)
-        main_frame.pack(expand=True, fill=tk.BOTH)
+        main_frame = self.main_screen = tk.Frame(self.root, padx=20, pady=20)
         
         # Folder name entry
         tk.Label(main_frame, text="Folder Name:").pack(pady=(10, 0))
-        self.folder_entry = tk.Entry(main_frame, width=30)
+        self.folder_entry = tk.Entry(main_frame, width=30, textvariable=self.folder_var)
         self.folder_entry.pack(pady=(0, 10))
-        self.folder_entry.insert(0, self.ui_state["folder_name"])
         
         # Area selection frame
         area_frame = tk.Frame(main_frame)
@@ -128,62 +320,169 @@ class ScreenshotTool:
         coord_frame.pack(pady=10)
         
         # Coordinate entry fields
-        self.coord_vars = []
         labels = ['X:', 'Y:', 'Width:', 'Height:']
         for i, label in enumerate(labels):
             tk.Label(coord_frame, text=label).grid(row=0, column=i*2, padx=2)
-            var = tk.StringVar()
-            entry = tk.Entry(coord_frame, textvariable=var, width=5)
+            entry = tk.Entry(coord_frame, textvariable=self.coord_vars[i], width=5)
             entry.grid(row=0, column=i*2+1, padx=2)
-            self.coord_vars.append(var)
-            if i < len(self.ui_state["coordinates"]):
-                var.set(self.ui_state["coordinates"][i])
         
         # Update coordinates button
         tk.Button(coord_frame, text="Update", command=self.update_coords).grid(row=0, column=8, padx=5)
         
-        # Take screenshot button centered
-        tk.Button(main_frame, text="Take Screenshot", command=self.take_screenshot).pack(pady=10)
+        # Capture buttons centered
+        capture_frame = tk.Frame(main_frame)
+        capture_frame.pack(pady=10)
+        tk.Button(capture_frame, text="Take Screenshot", command=self.take_screenshot).pack(side=tk.LEFT, padx=5)
+        tk.Button(capture_frame, text="Burst", command=self.take_burst).pack(side=tk.LEFT, padx=5)
+        self.watch_button = tk.Button(capture_frame, text="Watch", command=self.toggle_watch)
+        self.watch_button.pack(side=tk.LEFT, padx=5)
+        
+        # Replay buffer buttons
+        replay_frame = tk.Frame(main_frame)
+        replay_frame.pack()
+        self.replay_button = tk.Button(replay_frame, text="Start Replay", command=self.toggle_replay)
+        self.replay_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(replay_frame, text="Save Replay", command=self.save_replay).pack(side=tk.LEFT, padx=5)
         
         # Preview frame
         self.preview_frame = tk.Frame(main_frame, borderwidth=2, relief="groove")
         self.preview_frame.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.previews.background = tuple(value // 257 for value in self.root.winfo_rgb(self.preview_frame.cget("bg")))
         self.preview_label = tk.Label(self.preview_frame, text="Screenshot preview will appear here")
-        self.preview_label.pack(pady=20)
+        self.preview_label.pack(pady=10)
+        self.preview_caption = tk.Label(self.preview_frame, text="")
+        self.preview_caption.pack()
         
-        # Settings button centered
-        tk.Button(main_frame, text="Settings", command=self.show_settings).pack(pady=10)
+        # Gallery and settings buttons centered
+        menu_frame = tk.Frame(main_frame)
+        menu_frame.pack(pady=10)
+        tk.Button(menu_frame, text="Gallery", command=self.show_gallery).pack(side=tk.LEFT, padx=5)
+        tk.Button(menu_frame, text="Settings", command=self.show_settings).pack(side=tk.LEFT, padx=5)
         
-        # Notification area (persistent)
-        self.notification_frame = tk.Frame(self.root, height=30)
-        self.notification_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
-        self.notification_label = tk.Label(self.notification_frame, text="", height=1)
-        self.notification_label.pack(fill=tk.X)
+        self.show_main_screen()
         
         # Restore window geometry
         if self.settings.get("window_geometry"):
             self.root.geometry(self.settings["window_geometry"])
 
-    def update_preview(self, image):
-        """Update the preview area with the taken screenshot"""
-        for widget in self.preview_frame.winfo_children():
-            widget.destroy()
-        
-        max_width = 380
-        max_height = 300
-        
-        img_width, img_height = image.size
-        if img_width > max_width or img_height > max_height:
-            ratio = min(max_width/img_width, max_height/img_height)
-            new_size = (int(img_width * ratio), int(img_height * ratio))
-            image = image.resize(new_size, ImageTk.Image.Resampling.LANCZOS)
-        
-        self.last_screenshot = ImageTk.PhotoImage(image)
-        self.preview_label = tk.Label(self.preview_frame, image=self.last_screenshot)
-        self.preview_label.pack(pady=10)
+    def show_main_screen(self):
+        """Swap the settings or gallery screen out for the main screen"""
+        if self.settings_screen is not None:
+            self.settings_screen.pack_forget()
+        if self.gallery_screen is not None:
+            self.gallery.stop()
+            self.gallery_folder = None
+            self.gallery_screen.pack_forget()
+        self.main_screen.pack(expand=True, fill=tk.BOTH)
+    
+    def show_gallery(self):
+        """Show the captures in the current folder"""
+        self.save_ui_state()
+        if self.gallery_screen is None:
+            self.create_gallery_gui()
+        self.gallery_folder = self.current_folder()
+        self.load_gallery()
+        self.rescan_gallery()
+        self.main_screen.pack_forget()
+        self.gallery_screen.pack(expand=True, fill=tk.BOTH)
+        self.gallery.start()
+    
+    def create_gallery_gui(self):
+        """Create the gallery screen once, its contents are filled in by load_gallery"""
+        from gallery import GalleryView
+        from thumbnail_cache import ThumbnailCache
+        
+        self.wait_for_warm_up()
+        self.thumbnails = ThumbnailCache(
+            self.settings["thumbnail_cache_dir"],
+            max_bytes=self.settings["thumbnail_cache_mb"] * 1024 * 1024,
+            background=self.previews.background
+        )
+        
+        main_frame = self.gallery_screen = tk.Frame(self.root, padx=10, pady=10)
+        top_frame = tk.Frame(main_frame)
+        top_frame.pack(fill=tk.X)
+        tk.Button(top_frame, text="Back to Main Menu", command=self.show_main_screen).pack(side=tk.LEFT)
+        self.gallery_label = tk.Label(top_frame, text="", anchor=tk.W)
+        self.gallery_label.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+        
+        self.gallery = GalleryView(main_frame, self.thumbnails, on_open=self.open_capture)
+        self.gallery.frame.pack(pady=(10, 0), expand=True, fill=tk.BOTH)
+    
+    def load_gallery(self, keep_position=False):
+        """List the captures in the gallery folder, from the capture index when there is one"""
+        folder = self.gallery_folder
+        if self.capture_index:
+            count = self.capture_index.count(folder)
+            fetch = lambda offset, limit: self.capture_index.page(folder, offset, limit)
+        else:
+            from capture_index import IMAGE_EXTENSIONS, capture_time
+            try:
+                with os.scandir(folder) as entries:
+                    # Same order as the index: the time in the name, else the modification time
+                    found = [(capture_time(entry.path, entry.stat().st_mtime), entry.path) for entry in entries
+                             if entry.name.lower().endswith(IMAGE_EXTENSIONS)]
+            except FileNotFoundError:
+                found = []
+            paths = [path for _, path in sorted(found, reverse=True)]
+            count = len(paths)
+            fetch = lambda offset, limit: paths[offset:offset + limit]
+        self.gallery.load(count, fetch, keep_position)
+        self.gallery_label.config(text=f"{count} captures in '{self.folder_var.get() or os.path.basename(folder)}'")
+    
+    def rescan_gallery(self):
+        """Bring the index in line with the gallery folder in the background, for files it missed"""
+        if not self.capture_index:
+            return
+        index, folder = self.capture_index, self.gallery_folder
+        self.gallery_rescanned.clear()
+        
+        def rescan():
+            try:
+                stats = index.rebuild([folder], workers=2)
+                if stats["added"] or stats["removed"]:
+                    self.gallery_rescanned.set()
+            except Exception as e:
+                print(f"Error rescanning {folder}: {e}")
         
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        tk.Label(self.preview_frame, text=f"Screenshot taken at {timestamp}").pack()
+        threading.Thread(target=rescan, name="gallery-rescan", daemon=True).start()
+    
+    def open_capture(self, path):
+        """Show a capture from the gallery in the preview on the main screen"""
+        from PIL import Image
+        from capture_index import capture_time
+        try:
+            taken_at = datetime.fromtimestamp(capture_time(path, os.path.getmtime(path)))
+            # Decoded and converted on the preview thread
+            self.update_preview(Image.open(path), taken_at=taken_at)
+            self.show_main_screen()
+            self.show_notification(f"Showing {path}")
+        except Exception as e:
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+
+    def update_preview(self, image, release=None, taken_at=None):
+        """Queue the taken screenshot for the preview area, release(image) is called once it has been scaled"""
+        self.previews.submit(image, release, taken_at or datetime.now())
+        if self.preview_check_id is None:
+            self.preview_check_id = self.root.after(10, self.show_preview)
+    
+    def show_preview(self):
+        """Paste the newest scaled preview once the preview thread has one"""
+        result = self.previews.poll()
+        self.preview_check_id = self.root.after(10, self.show_preview) if self.previews.waiting else None
+        if result is None:
+            return
+        
+        preview, taken_at, submitted_at = result
+        if self.preview_photo is None:
+            from PIL import ImageTk
+            self.preview_photo = ImageTk.PhotoImage("RGB", self.previews.max_size)
+        self.preview_photo.paste(preview)
+        self.preview_latency = time.perf_counter() - submitted_at
+        self.preview_label.config(image=self.preview_photo, text="")
+        timestamp = taken_at.strftime("%Y-%m-%d %H:%M:%S")
+        self.preview_caption.config(
+            text=f"Screenshot taken at {timestamp} (preview {self.preview_latency * 1000:.0f} ms)")
     
     def show_notification(self, message, is_error=False):
         """Show a persistent notification in the bottom area"""
@@ -200,184 +499,240 @@ class ScreenshotTool:
     def show_settings(self):
         """Show the settings menu"""
         self.save_ui_state()
+        if self.settings_screen is None:
+            self.create_settings_gui()
+        self.load_settings_screen()
+        self.main_screen.pack_forget()
+        self.settings_screen.pack(expand=True, fill=tk.BOTH)
+    
+    def create_settings_gui(self):
+        """Create the settings screen once, its values are filled in by load_settings_screen"""
+        from capture_backends import BACKENDS
+        from encoders import PRESETS
         
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        
-        main_frame = tk.Frame(self.root, padx=20, pady=20)
-        main_frame.pack(expand=True, fill=tk.BOTH)
+        main_frame = self.settings_screen = tk.Frame(self.root, padx=20, pady=20)
         
         tk.Label(main_frame, text="Master Folder Path:").pack(pady=(10, 0))
         
         folder_frame = tk.Frame(main_frame)
         folder_frame.pack(pady=(0, 10), fill=tk.X)
         
-        self.master_entry = tk.Entry(folder_frame, width=40)
-        self.master_entry.insert(0, self.settings["master_folder"])
+        self.master_var = tk.StringVar()
+        self.master_entry = tk.Entry(folder_frame, width=40, textvariable=self.master_var)
         self.master_entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
         
         tk.Button(folder_frame, text="Browse", command=self.browse_folder).pack(side=tk.LEFT, padx=5)
         
-        tk.Button(main_frame, text="Back to Main Menu", command=self.return_to_main).pack(pady=20)
+        # Capture backend selection
+        tk.Label(main_frame, text="Capture Backend:").pack(pady=(10, 0))
+        self.backend_var = tk.StringVar()
+        tk.OptionMenu(main_frame, self.backend_var, "auto", *BACKENDS).pack(pady=(0, 10))
         
-        # Notification area in settings too
-        self.notification_frame = tk.Frame(self.root, height=30)
-        self.notification_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
-        self.notification_label = tk.Label(self.notification_frame, text="", height=1)
-        self.notification_label.pack(fill=tk.X)
+        # Burst capture
+        burst_frame = tk.Frame(main_frame)
+        burst_frame.pack(pady=10)
+        tk.Label(burst_frame, text="Burst Frames:").grid(row=0, column=0, padx=2)
+        self.burst_frames_var = tk.StringVar()
+        tk.Entry(burst_frame, textvariable=self.burst_frames_var, width=5).grid(row=0, column=1, padx=2)
+        tk.Label(burst_frame, text="FPS:").grid(row=0, column=2, padx=2)
+        self.burst_fps_var = tk.StringVar()
+        tk.Entry(burst_frame, textvariable=self.burst_fps_var, width=5).grid(row=0, column=3, padx=2)
+        
+        # Image format, globally and for the current folder
+        format_frame = tk.Frame(main_frame)
+        format_frame.pack(pady=10)
+        tk.Label(format_frame, text="Default Format:").grid(row=0, column=0, sticky=tk.E, padx=2)
+        self.encoder_var = tk.StringVar()
+        tk.OptionMenu(format_frame, self.encoder_var, *PRESETS).grid(row=0, column=1, sticky=tk.W, padx=2)
+        self.folder_format_label = tk.Label(format_frame)
+        self.folder_format_label.grid(row=1, column=0, sticky=tk.E, padx=2)
+        self.folder_encoder_var = tk.StringVar()
+        tk.OptionMenu(format_frame, self.folder_encoder_var, "default", *PRESETS).grid(row=1, column=1, sticky=tk.W, padx=2)
+        tk.Label(format_frame, text="Duplicates:").grid(row=2, column=0, sticky=tk.E, padx=2)
+        self.dedup_var = tk.StringVar()
+        tk.OptionMenu(format_frame, self.dedup_var, *DedupIndex.MODES).grid(row=2, column=1, sticky=tk.W, padx=2)
+        tk.Label(format_frame, text="Select Area On:").grid(row=3, column=0, sticky=tk.E, padx=2)
+        self.selection_mode_var = tk.StringVar()
+        tk.OptionMenu(format_frame, self.selection_mode_var, "live", "frozen").grid(row=3, column=1, sticky=tk.W, padx=2)
+        self.per_monitor_var = tk.BooleanVar()
+        tk.Checkbutton(format_frame, text="Selection overlay per monitor",
+                       variable=self.per_monitor_var).grid(row=4, column=0, columnspan=2, pady=(5, 0))
+        self.save_on_release_var = tk.BooleanVar()
+        tk.Checkbutton(format_frame, text="Save frozen selection on release",
+                       variable=self.save_on_release_var).grid(row=5, column=0, columnspan=2)
+        self.loupe_var = tk.BooleanVar()
+        tk.Checkbutton(format_frame, text="Magnifier while selecting",
+                       variable=self.loupe_var).grid(row=6, column=0, columnspan=2)
+        
+        tk.Button(main_frame, text="Back to Main Menu", command=self.return_to_main).pack(pady=20)
+    
+    def load_settings_screen(self):
+        """Fill the settings screen from the current settings"""
+        self.master_var.set(self.settings["master_folder"])
+        self.backend_var.set(self.settings["capture_backend"])
+        self.burst_frames_var.set(str(self.settings["burst_frames"]))
+        self.burst_fps_var.set(str(self.settings["burst_fps"]))
+        self.encoder_var.set(self.settings["encoder"] if isinstance(self.settings["encoder"], str) else "custom")
+        folder_name = self.folder_var.get()
+        folder_encoder = self.settings["folder_encoders"].get(folder_name, "default")
+        self.folder_format_label.config(text=f"Format for '{folder_name}':")
+        self.folder_encoder_var.set(folder_encoder if isinstance(folder_encoder, str) else "custom")
+        self.dedup_var.set(self.settings["dedup_mode"])
+        self.selection_mode_var.set(self.settings["selection_mode"])
+        self.per_monitor_var.set(self.settings["selection_per_monitor"])
+        self.save_on_release_var.set(self.settings["frozen_save_on_release"])
+        self.loupe_var.set(self.settings["selection_loupe"])
     
     def return_to_main(self):
         """Return to main menu from settings"""
-        self.settings["master_folder"] = self.master_entry.get()
+        from capture_backends import create_backend
+        from encoders import PRESETS
+        try:
+            burst_frames = int(self.burst_frames_var.get())
+            burst_fps = int(self.burst_fps_var.get())
+        except ValueError:
+            self.show_notification("Burst frames and FPS must be whole numbers", is_error=True)
+            return
+        self.settings["burst_frames"] = max(1, burst_frames)
+        self.settings["burst_fps"] = max(1, min(60, burst_fps))
+        
+        self.settings["master_folder"] = self.master_var.get()
+        
+        # Custom encoder configs from the settings file are kept unless a preset is picked
+        if self.encoder_var.get() in PRESETS:
+            self.settings["encoder"] = self.encoder_var.get()
+        folder_name = self.folder_var.get()
+        if self.folder_encoder_var.get() == "default":
+            self.settings["folder_encoders"].pop(folder_name, None)
+        elif self.folder_encoder_var.get() in PRESETS:
+            self.settings["folder_encoders"][folder_name] = self.folder_encoder_var.get()
+        
+        self.settings["dedup_mode"] = self.dedup_var.get()
+        self.dedup.mode = self.settings["dedup_mode"]
+        self.settings["selection_per_monitor"] = self.per_monitor_var.get()
+        self.settings["selection_mode"] = self.selection_mode_var.get()
+        self.settings["frozen_save_on_release"] = self.save_on_release_var.get()
+        self.settings["selection_loupe"] = self.loupe_var.get()
+        self.overlay.use_loupe = self.settings["selection_loupe"]
+        self.overlay.per_monitor = self.settings["selection_per_monitor"]
+        
+        if self.backend_var.get() != self.settings["capture_backend"]:
+            self.settings["capture_backend"] = self.backend_var.get()
+            self.backend_name = self.settings["capture_backend"]
+            if self._capture_session:
+                self._capture_session.set_backend(create_backend(self.backend_name))
         self.save_settings()
-        self.create_main_gui()
-        self.restore_ui_state()
+        self.show_main_screen()
     
     def browse_folder(self):
         """Open folder browser dialog"""
         folder_selected = filedialog.askdirectory()
         if folder_selected:
-            self.master_entry.delete(0, tk.END)
-            self.master_entry.insert(0, folder_selected)
+            self.master_var.set(folder_selected)
             self.show_notification(f"Master folder will be saved when you return to main menu")
     
     def start_area_selection(self):
         """Start the area selection process"""
         self.save_ui_state()
-        self.root.withdraw()
-        self.selection_active = True
-        self.selection_started = False
-        
-        # Create selection window that spans all monitors
-        self.selector = tk.Toplevel()
-        self.selector.overrideredirect(True)  # Remove window decorations
-        self.selector.attributes('-alpha', 0.3)
-        self.selector.configure(bg='black')
-        
-        # Position and size to cover all monitors
-        self.selector.geometry(f"{self.virtual_screen[2]}x{self.virtual_screen[3]}+{self.virtual_screen[0]}+{self.virtual_screen[1]}")
-        
-        # Create canvas for drawing
-        self.canvas = tk.Canvas(self.selector, cursor="cross", bg='black', highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-        
-        # Coordinate display label
-        self.coord_label = tk.Label(self.selector, text="(0, 0)", bg='white', fg='black')
-        self.coord_label.place(x=10, y=10)
-        
-        # Initialize selection variables
-        self.start_x = None
-        self.start_y = None
-        self.rect = None
-        self.crosshair_lines = []
-        
-        # Bind events
-        self.canvas.bind("<Motion>", self.update_crosshair)
-        self.canvas.bind("<ButtonPress-1>", self.on_press)
-        self.canvas.bind("<B1-Motion>", self.on_drag)
-        self.canvas.bind("<ButtonRelease-1>", self.on_release)
-        self.selector.bind("<Escape>", lambda e: self.cancel_selection())
-        self.selector.bind("<FocusOut>", lambda e: self.cancel_selection())
-        
-        # Make sure the selector window is focused
-        self.selector.focus_force()
-    
-    def update_crosshair(self, event):
-        """Update crosshair lines and coordinate display"""
-        # Remove old crosshair lines
-        for line in self.crosshair_lines:
-            self.canvas.delete(line)
-        self.crosshair_lines = []
-        
-        # Draw vertical line
-        self.crosshair_lines.append(
-            self.canvas.create_line(event.x, 0, event.x, self.virtual_screen[3], 
-                                   fill='red', dash=(2, 2))
-        )
-        
-        # Draw horizontal line
-        self.crosshair_lines.append(
-            self.canvas.create_line(0, event.y, self.virtual_screen[2], event.y, 
-                                   fill='red', dash=(2, 2))
-        )
-        
-        # Update coordinate display
-        self.coord_label.config(text=f"({event.x}, {event.y})")
-    
-    def on_press(self, event):
-        """Handle mouse button press"""
-        self.selection_started = True
-        self.start_x = event.x
-        self.start_y = event.y
-        self.rect = self.canvas.create_rectangle(
-            self.start_x, self.start_y, 
-            self.start_x, self.start_y, 
-            outline='red', width=2
-        )
+        self.check_layout()
+        if self.settings["selection_mode"] == "frozen" or self.settings["selection_loupe"]:
+            # The window has to be off screen before the still is taken
+            self.capture_timing = {"start": time.perf_counter()}
+            self.hide_for_capture(self.open_selection_with_still)
+        else:
+            self.root.withdraw()
+            self.overlay.show(self.virtual_screen, self.layout.monitors)
     
-    def on_drag(self, event):
-        """Handle mouse drag"""
-        if self.rect:
-            self.canvas.coords(
-                self.rect, 
-                self.start_x, self.start_y, 
-                event.x, event.y
-            )
-            self.update_crosshair(event)
+    def open_selection_with_still(self):
+        """Take a still of the whole virtual screen for the frozen overlay and the loupe"""
+        x, y, width, height = self.virtual_screen
+        try:
+            grab_start = time.perf_counter()
+            frame = self.capture_session.backend.grab((x, y, x + width, y + height))
+            self.capture_timing["grab"] = time.perf_counter() - grab_start
+        except Exception as e:
+            self.root.deiconify()
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+            return
+        self.overlay.show(self.virtual_screen, self.layout.monitors, frame,
+                          frozen=self.settings["selection_mode"] == "frozen")
     
-    def on_release(self, event):
-        """Handle mouse button release"""
-        if self.rect:
-            end_x = event.x
-            end_y = event.y
-            
-            x1 = min(self.start_x, end_x)
-            y1 = min(self.start_y, end_y)
-            x2 = max(self.start_x, end_x)
-            y2 = max(self.start_y, end_y)
-            
-            self.selected_area = (x1, y1, x2-x1, y2-y1)
-            self.update_coord_display()
-            self.show_notification("Area selected successfully")
-            
-            self.cleanup_selection()
+    def prepare_overlay(self):
+        """Build the selection overlay ahead of time once the monitor layout is known"""
+        if not self.warmup_done.is_set():
+            self.root.after(100, self.prepare_overlay)
+            return
+        if not self.overlay.built:
+            self.overlay.build(self.virtual_screen, self.layout.monitors)
     
-    def cleanup_selection(self):
-        """Clean up selection resources"""
-        if self.selector:
-            self.selector.destroy()
+    def on_area_selected(self, area, frame=None):
+        """Use the area picked on the selection overlay, saving it straight from frame if enabled"""
         self.root.deiconify()
-        self.selection_active = False
-        self.selection_started = False
-    
-    def cancel_selection(self):
-        """Cancel the selection process"""
-        if self.selection_active:
-            if self.selection_started:
-                # If selection was started but not completed
-                self.show_notification("Area selection canceled", is_error=True)
-            else:
-                # If selection wasn't even started
-                self.show_notification("Area selection canceled before starting", is_error=True)
-            self.cleanup_selection()
+        if area[2] <= 0 or area[3] <= 0:
+            # A click without dragging, keep the previous area
+            self.show_notification("Selected area is empty, drag to select an area", is_error=True)
+            return
+        self.selected_area = area
+        self.update_coord_display()
+        if frame is not None and self.settings["frozen_save_on_release"]:
+            self.save_from_frame(area, frame)
+        else:
+            self.show_notification(f"Area selected successfully ({self.overlay.format_stats()})")
+    
+    def save_from_frame(self, area, frame):
+        """Save area as cut from the frozen still, exactly as it was shown, without grabbing again"""
+        if area[2] <= 0 or area[3] <= 0:
+            self.show_notification("Selected area is empty", is_error=True)
+            return
+        try:
+            # Only the selected pixels are copied out of the still
+            screenshot = frame.crop((area[0], area[1], area[0] + area[2], area[1] + area[3]))
+            self.update_preview(screenshot)
+            job = self.save_pipeline.submit(
+                screenshot,
+                self.current_folder(),
+                encoder=self.get_encoder(),
+                bbox=area_to_bbox(area, self.virtual_screen)
+            )
+            timing = self.capture_timing
+            self.show_notification(
+                f"Saving selection to: {job.filename} (hide {timing.get('hide', 0) * 1000:.0f} ms, "
+                f"grab {timing.get('grab', 0) * 1000:.0f} ms, no second grab)"
+            )
+        except queue.Full:
+            self.show_notification("Still saving previous screenshots, please try again", is_error=True)
+        except Exception as e:
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+    
+    def cancel_selection(self, started):
+        """Report a selection that was closed without picking an area"""
+        self.root.deiconify()
+        if started:
+            # If selection was started but not completed
+            self.show_notification("Area selection canceled", is_error=True)
+        else:
+            # If selection wasn't even started
+            self.show_notification("Area selection canceled before starting", is_error=True)
     
     def update_coord_display(self):
         """Update the coordinate entry fields"""
         if self.selected_area:
             for i, val in enumerate(self.selected_area):
                 self.coord_vars[i].set(str(val))
-                self.ui_state["coordinates"][i] = str(val)
+            self.follow_selection()
     
     def update_coords(self):
         """Update selected area from manual coordinate entry"""
         try:
             coords = [int(var.get()) for var in self.coord_vars]
-            if len(coords) == 4:
+            if len(coords) != 4:
+                self.show_notification("Please enter all four values", is_error=True)
+            elif coords[2] <= 0 or coords[3] <= 0:
+                self.show_notification("Width and height must be greater than 0", is_error=True)
+            else:
                 self.selected_area = tuple(coords)
-                self.ui_state["coordinates"] = coords
+                self.follow_selection()
                 self.show_notification("Coordinates updated successfully")
-            else:
-                self.show_notification("Please enter all four values", is_error=True)
         except ValueError:
             self.show_notification("Please enter valid numbers", is_error=True)
     
@@ -386,49 +741,406 @@ class ScreenshotTool:
         if not self.selected_area:
             self.show_notification("Please select an area first", is_error=True)
             return
+        if self.capture_in_progress:
+            return
             
         self.save_ui_state()
+        self.capture_in_progress = True
+        self.capture_timing = {"start": time.perf_counter()}
+        
+        self.check_layout()
+        bbox = self.get_capture_bbox()
+        if self.settings["hide_mode"] == "always" or self.window_overlaps(bbox):
+            self.hide_for_capture(lambda: self.grab_and_save(bbox))
+        else:
+            # Region is clear of the tool window, no need to hide it
+            self.capture_timing["hide"] = 0.0
+            self.grab_and_save(bbox)
+    
+    def current_folder(self):
+        """Folder captures are saved to"""
+        return settings_store.folder_path(self.settings, self.folder_var.get())
+    
+    def follow_selection(self):
+        """Point the background capture modes at the current area and folder"""
+        if self.replay:
+            self.replay.set_bbox(self.get_capture_bbox())
+        if self.watcher:
+            self.watcher.set_target(self.get_capture_bbox(), self.current_folder())
+    
+    def get_capture_bbox(self):
+        """Screen bounding box of the selected area, adjusted for the virtual screen"""
+        return area_to_bbox(self.selected_area, self.virtual_screen)
+    
+    def window_overlaps(self, bbox):
+        """Check whether bbox overlaps the tool window, including its frame"""
+        margin = self.WINDOW_FRAME_MARGIN
+        left = self.root.winfo_rootx() - margin
+        top = self.root.winfo_rooty() - margin
+        right = self.root.winfo_rootx() + self.root.winfo_width() + margin
+        bottom = self.root.winfo_rooty() + self.root.winfo_height() + margin
+        return bbox[0] < right and bbox[2] > left and bbox[1] < bottom and bbox[3] > top
+    
+    def on_root_unmap(self, event):
+        """Record when the window manager confirms the main window is hidden"""
+        if event.widget is self.root and self.hide_confirmed_at is None:
+            self.hide_confirmed_at = time.perf_counter()
+    
+    def hide_for_capture(self, callback):
+        """Withdraw the main window and run callback once it is off screen"""
+        self.hide_confirmed_at = None
+        hide_start = time.perf_counter()
+        self.root.withdraw()
+        self.wait_for_hide(hide_start, callback)
+    
+    def wait_for_hide(self, hide_start, callback):
+        """Poll for the unmap confirmation without blocking the event loop"""
+        elapsed = time.perf_counter() - hide_start
+        fallback = self.settings["hide_fallback_delay"]
         
+        if self.hide_confirmed_at is not None:
+            # Learn how long the window system takes, so the fallback shrinks over time
+            latency = self.hide_confirmed_at - hide_start
+            self.hide_latency = latency if self.hide_latency is None else 0.8 * self.hide_latency + 0.2 * latency
+            self.settings["hide_fallback_delay"] = min(
+                self.MAX_HIDE_DELAY,
+                max(self.MIN_HIDE_DELAY, 3 * self.hide_latency + self.settings["hide_settle_delay"])
+            )
+            settle_ms = int(self.settings["hide_settle_delay"] * 1000)
+            self.root.after(settle_ms, lambda: self.on_window_hidden(hide_start, callback))
+        elif elapsed >= fallback:
+            # No unmap event arrived, the fallback delay has already been waited out
+            self.on_window_hidden(hide_start, callback)
+        else:
+            self.root.after(2, lambda: self.wait_for_hide(hide_start, callback))
+    
+    def on_window_hidden(self, hide_start, callback):
+        """Record the hide time and continue with the capture"""
+        self.capture_timing["hide"] = time.perf_counter() - hide_start
+        callback()
+    
+    def grab_and_save(self, bbox):
+        """Grab bbox, restore the window and queue the image for saving"""
+        screenshot = None
         try:
-            self.root.withdraw()
-            time.sleep(0.2)
-            
-            # Adjust coordinates for virtual screen
-            adjusted_x = self.selected_area[0] + self.virtual_screen[0]
-            adjusted_y = self.selected_area[1] + self.virtual_screen[1]
-            
-            screenshot = ImageGrab.grab(bbox=(
-                adjusted_x,
-                adjusted_y,
-                adjusted_x + self.selected_area[2],
-                adjusted_y + self.selected_area[3]
-            ))
-            
-            full_path = os.path.join(self.settings["master_folder"], self.ui_state["folder_name"])
-            os.makedirs(full_path, exist_ok=True)
+            # Before grabbing, so a bad encoder setting cannot leave a pooled frame held
+            encoder = self.get_encoder()
+            grab_start = time.perf_counter()
+            screenshot = self.capture_session.grab(bbox)
+            self.capture_timing["grab"] = time.perf_counter() - grab_start
+            self.root.deiconify()
+            self.capture_timing["total"] = time.perf_counter() - self.capture_timing["start"]
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(full_path, f"screenshot_{timestamp}.png")
-            screenshot.save(filename)
+            # Encoding and writing happen on the save workers
+            full_path = self.current_folder()
+            # The preview and the save workers each hold the frame until they are done with it
+            self.capture_session.retain(screenshot)
+            self.update_preview(screenshot, release=self.capture_session.release)
+            job = self.save_pipeline.submit(
+                screenshot,
+                full_path,
+                release=self.capture_session.release,
+                encoder=encoder,
+                bbox=bbox
+            )
+            self.show_notification(f"Saving screenshot to: {job.filename} ({self.format_capture_timing()})")
             
+        except queue.Full:
+            self.capture_session.release(screenshot)
+            self.show_notification("Still saving previous screenshots, please try again", is_error=True)
             self.root.deiconify()
-            self.update_preview(screenshot)
-            self.show_notification(f"Screenshot saved to: {filename}")
-            
         except Exception as e:
             self.show_notification(f"Error: {str(e)}", is_error=True)
             self.root.deiconify()
+        finally:
+            self.capture_in_progress = False
+    
+    def get_encoder(self):
+        """Encoder configured for the current folder, falling back to the default format"""
+        config = settings_store.folder_encoder_config(self.settings, self.folder_var.get())
+        # Encoders are kept so auto mode keeps its measurements between captures
+        key = json.dumps(config, sort_keys=True)
+        if key not in self.encoders:
+            from encoders import create_encoder
+            self.encoders[key] = create_encoder(config)
+        return self.encoders[key]
+    
+    def format_capture_timing(self):
+        """Describe the last hide-grab-show cycle in milliseconds"""
+        timing = self.capture_timing
+        return (f"hide {timing.get('hide', 0) * 1000:.0f} ms, "
+                f"grab {timing.get('grab', 0) * 1000:.0f} ms, "
+                f"total {timing.get('total', 0) * 1000:.0f} ms, "
+                f"allocated {self.capture_session.last_bytes} bytes")
+    
+    def take_burst(self):
+        """Capture a burst of frames of the selected area at a fixed rate"""
+        if not self.selected_area:
+            self.show_notification("Please select an area first", is_error=True)
+            return
+        if self.capture_in_progress or self.burst:
+            return
+        
+        self.save_ui_state()
+        try:
+            encoder = self.get_encoder()
+        except ValueError as e:
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+            return
+        self.capture_in_progress = True
+        self.capture_timing = {"start": time.perf_counter()}
+        
+        from burst import BurstCapture
+        try:
+            self.check_layout()
+            bbox = self.get_capture_bbox()
+            self.burst = BurstCapture(
+                self.capture_session.backend,
+                bbox,
+                self.current_folder(),
+                self.save_pipeline,
+                frames=self.settings["burst_frames"],
+                fps=self.settings["burst_fps"],
+                max_bytes=self.settings["burst_max_mb"] * 1024 * 1024,
+                encode_during=self.settings["burst_encode_during"],
+                encoder=encoder
+            )
+        except Exception as e:
+            self.capture_in_progress = False
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+            return
+        if self.settings["hide_mode"] == "always" or self.window_overlaps(bbox):
+            self.hide_for_capture(self.start_burst)
+        else:
+            self.start_burst()
+    
+    def start_burst(self):
+        """Start the prepared burst and watch its progress"""
+        self.burst.start()
+        self.root.after(50, self.check_burst)
+    
+    def check_burst(self):
+        """Restore the window when the burst is captured and report once it is saved"""
+        burst = self.burst
+        if not burst.capture_done.is_set():
+            if burst.last_frame and self.root.state() != "withdrawn":
+                # Progress preview; only the newest frame is rendered, older ones are dropped.
+                # A slot refilled while it is scaled can mix two consecutive frames, fine for a preview
+                self.update_preview(burst.last_frame)
+            self.root.after(50, self.check_burst)
+            return
+        
+        if self.capture_in_progress:
+            self.capture_in_progress = False
+            self.root.deiconify()
+            if burst.last_frame:
+                self.update_preview(burst.last_frame)
+        
+        # Frames captured before an error are still saved, keep the error showing meanwhile
+        if burst.error:
+            self.show_notification(
+                f"Burst stopped: {str(burst.error)} ({burst.summary()}, saved {burst.saved}/{burst.captured})",
+                is_error=True
+            )
+        elif burst.finished:
+            self.show_notification(f"Burst saved: {burst.summary()}")
+        else:
+            self.show_notification(f"Burst captured {burst.summary()}, saved {burst.saved}/{burst.captured}")
+        if burst.finished:
+            self.burst = None
+        else:
+            self.root.after(100, self.check_burst)
+    
+    def toggle_watch(self):
+        """Start or stop saving the selected area whenever its content changes"""
+        if self.watcher:
+            self.watcher.stop()
+            self.show_notification(f"Stopped watching, saved {self.watcher.saves} of {self.watcher.samples} samples")
+            self.watcher = None
+            self.watch_button.config(text="Watch")
+            return
+        if not self.selected_area:
+            self.show_notification("Please select an area first", is_error=True)
+            return
+        
+        self.save_ui_state()
+        try:
+            encoder = self.get_encoder()
+        except ValueError as e:
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+            return
+        from change_watch import ChangeWatcher
+        self.watcher = ChangeWatcher(
+            self.capture_session.backend,
+            self.get_capture_bbox(),
+            self.current_folder(),
+            self.save_pipeline,
+            encoder=encoder,
+            threshold=self.settings["watch_threshold"],
+            fps=self.settings["watch_fps"],
+            debounce=self.settings["watch_debounce"],
+            max_rate=self.settings["watch_max_rate"],
+            cpu_budget=self.settings["watch_cpu_budget"]
+        )
+        self.watcher.start()
+        self.watch_button.config(text="Stop Watch")
+        self.show_notification(f"Watching for changes over {self.settings['watch_threshold'] * 100:g}% of the area")
+    
+    def toggle_replay(self):
+        """Start or stop sampling the selected area into the replay buffer"""
+        if self.replay:
+            self.replay.stop()
+            self.replay = None
+            self.replay_button.config(text="Start Replay")
+            self.show_notification("Replay buffer stopped")
+            return
+        if not self.selected_area:
+            self.show_notification("Please select an area first", is_error=True)
+            return
+        
+        from replay_buffer import ReplayBuffer
+        self.replay = ReplayBuffer(
+            self.capture_session.backend,
+            self.get_capture_bbox(),
+            fps=self.settings["replay_fps"],
+            max_bytes=self.settings["replay_max_mb"] * 1024 * 1024,
+            max_seconds=self.settings["replay_seconds"],
+            eviction=self.settings["replay_eviction"]
+        )
+        self.replay.start()
+        self.replay_button.config(text="Stop Replay")
+        self.show_notification(f"Replay buffer keeping the last {self.settings['replay_seconds']} seconds")
+    
+    def save_replay(self, event=None):
+        """Write the last seconds of the replay buffer to the current folder"""
+        if not self.replay:
+            self.show_notification("Replay buffer is not running", is_error=True)
+            return
+        if self.replay.error:
+            self.show_notification(f"Error: {str(self.replay.error)}", is_error=True)
+            return
+        
+        self.save_ui_state()
+        try:
+            encoder = self.get_encoder()
+        except ValueError as e:
+            self.show_notification(f"Error: {str(e)}", is_error=True)
+            return
+        full_path = self.current_folder()
+        dump = self.replay.dump(
+            self.settings["replay_dump_seconds"],
+            full_path,
+            self.save_pipeline,
+            self.settings["replay_format"],
+            encoder=encoder
+        )
+        self.root.after(100, lambda: self.check_replay_dump(dump, full_path))
+    
+    def check_replay_dump(self, dump, folder):
+        """Report once a replay dump has been written"""
+        if not dump.finished:
+            self.root.after(100, lambda: self.check_replay_dump(dump, folder))
+            return
+        if dump.error:
+            self.show_notification(f"Error: {str(dump.error)}", is_error=True)
+        elif not dump.frames:
+            self.show_notification("Replay buffer is empty", is_error=True)
+        else:
+            self.show_notification(f"Saved {dump.frames} replay frames to: {folder}")
+    
+    def process_save_results(self):
+        """Report finished background saves in the notification bar"""
+        if not self.warmup_done.is_set():
+            self.root.after(100, self.process_save_results)
+            return
+        for job in self.save_pipeline.poll():
+            if job.ok and self.burst:
+                # Burst progress is reported by check_burst
+                continue
+            if job.ok and job.duplicate_of:
+                action = "linked to" if self.dedup.mode == "hardlink" else "not saved, same as"
+                self.show_notification(
+                    f"Deduplicated: {action} {os.path.basename(job.duplicate_of)} "
+                    f"({self.dedup.duplicates} duplicates, {self.dedup.bytes_saved / 1048576:.1f} MB saved)"
+                )
+            elif job.ok:
+                self.show_notification(f"Screenshot saved to: {job.filename}")
+            else:
+                self.show_notification(f"Error: {str(job.error)}", is_error=True)
+            if job.ok and self.gallery_folder and os.path.abspath(job.folder) == os.path.abspath(self.gallery_folder):
+                self.gallery_rescanned.set()
+        if self.gallery_rescanned.is_set():
+            self.gallery_rescanned.clear()
+            if self.gallery_folder:
+                self.load_gallery(keep_position=True)
+        self.check_background_modes()
+        self.root.after(100, self.process_save_results)
+    
+    def check_background_modes(self):
+        """Report and switch off background capture modes that stopped on an error"""
+        if self.watcher and not self.watcher.running:
+            self.show_notification(f"Watch stopped: {str(self.watcher.error)}", is_error=True)
+            self.watcher = None
+            self.watch_button.config(text="Watch")
+        if self.replay and not self.replay.running:
+            self.show_notification(f"Replay stopped: {str(self.replay.error)}", is_error=True)
+            self.replay = None
+            self.replay_button.config(text="Start Replay")
+    
+    def on_close(self):
+        """Finish pending saves before closing the window"""
+        if self.replay:
+            self.replay.stop()
+        if self.watcher:
+            self.watcher.stop()
+        self.previews.stop()
+        if self.thumbnails:
+            self.thumbnails.stop()
+        # Keep the last window position, written together with any pending change
+        self.settings["window_geometry"] = self.root.geometry()
+        self.save_settings()
+        self.store.flush()
+        if self.warmup_thread:
+            self.warmup_done.wait()
+        if self._save_pipeline:
+            self._save_pipeline.shutdown(wait=True)
+        if self.capture_index:
+            self.capture_index.close()
+        if self._capture_session:
+            self._capture_session.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    root.iconbitmap("logo.ico")
-    window_width = 400
-    window_height = 500
-    screen_width = root.winfo_screenwidth()
-    screen_height = root.winfo_screenheight()
-    x = (screen_width // 2) - (window_width // 2)
-    y = (screen_height // 2) - (window_height // 2)
-    root.geometry(f'{window_width}x{window_height}+{x}+{y}')
-    
-    app = ScreenshotTool(root)
-    root.mainloop()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Screenshot Tool")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Print where startup time went once the tool is ready")
+    parser.add_argument("--startup-check", action="store_true",
+                        help="Print the startup profile and exit, with status 1 if startup is over budget")
+    parser.add_argument("--stress-screens", type=int, metavar="N",
+                        help="Switch between the main and settings screens N times, report leaks and exit")
+    args = parser.parse_args()
+    
+    profiler = StartupProfiler(STARTUP_START)
+    profiler.add("import modules", STARTUP_START, time.perf_counter())
+    with profiler.phase("create window"):
+        root = tk.Tk()
+        try:
+            root.iconbitmap("logo.ico")
+        except tk.TclError as e:
+            print(f"Error loading icon: {e}")
+        window_width = 400
+        window_height = 500
+        screen_width = root.winfo_screenwidth()
+        screen_height = root.winfo_screenheight()
+        x = (screen_width // 2) - (window_width // 2)
+        y = (screen_height // 2) - (window_height // 2)
+        root.geometry(f'{window_width}x{window_height}+{x}+{y}')
+    
+    app = ScreenshotTool(root, profiler)
+    if args.startup_profile or args.startup_check:
+        app.report_startup(check=args.startup_check)
+    if args.stress_screens:
+        app.stress_screens(args.stress_screens)
+    root.mainloop()
+    sys.exit(app.exit_code)
\ No newline at end of file
@@ -0,0 +1,489 @@
+import time
+import tkinter as tk
+
+
+class FrozenFrame:
+    """Dimmed still of a pane's area with the selection shown at full brightness
+
+    The dimmed frame is a single canvas image made once. The selection is
+    drawn on top with TILE-sized images on a fixed grid. Tiles fully
+    inside the selection show the plain frame, tiles on its edge a mix of
+    both, and tiles outside it are hidden. When the selection changes,
+    only tiles whose covered part changed are rendered again and pasted
+    into their existing PhotoImage. A drag therefore costs about the
+    perimeter it sweeps, not the size of the desktop.
+    """
+    TILE = 256
+    DIM = 0.4
+
+    def __init__(self, canvas, image):
+        from PIL import ImageTk
+        self.canvas = canvas
+        self.image = image
+        self.dimmed = image.point([int(value * self.DIM) for value in range(256)] * len(image.getbands()))
+        self.background_photo = ImageTk.PhotoImage(self.dimmed)
+        self.background = canvas.create_image(0, 0, anchor=tk.NW, image=self.background_photo, tags="frame")
+        canvas.tag_lower("frame")
+
+        # (column, row) -> [item, photo, covered box in frame coordinates]
+        self.tiles = {}
+        self.selection = None
+        self.pasted = 0
+
+    def tile_range(self, box):
+        """Columns and rows of the tiles that box touches"""
+        x1, y1, x2, y2 = box
+        return (range(x1 // self.TILE, (x2 - 1) // self.TILE + 1),
+                range(y1 // self.TILE, (y2 - 1) // self.TILE + 1))
+
+    def clip(self, box):
+        """box limited to the frame, or None if nothing is left"""
+        if box is None:
+            return None
+        x1, y1, x2, y2 = box
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, self.image.width), min(y2, self.image.height)
+        if x1 >= x2 or y1 >= y2:
+            return None
+        return (x1, y1, x2, y2)
+
+    def set_selection(self, box):
+        """Show box, (left, top, right, bottom) in frame coordinates or None, at full brightness"""
+        box = self.clip(box)
+        if box == self.selection:
+            return
+        tiles = set()
+        for area in (self.selection, box):
+            if area:
+                columns, rows = self.tile_range(area)
+                tiles.update((column, row) for column in columns for row in rows)
+        self.selection = box
+        for column, row in tiles:
+            self.update_tile(column, row)
+
+    def update_tile(self, column, row):
+        left, top = column * self.TILE, row * self.TILE
+        right, bottom = min(left + self.TILE, self.image.width), min(top + self.TILE, self.image.height)
+        covered = None
+        if self.selection:
+            x1, y1, x2, y2 = self.selection
+            covered = self.clip((max(x1, left), max(y1, top), min(x2, right), min(y2, bottom)))
+
+        tile = self.tiles.get((column, row))
+        if tile and tile[2] == covered:
+            return
+        if covered is None:
+            if tile:
+                self.canvas.itemconfigure(tile[0], state=tk.HIDDEN)
+                tile[2] = None
+            return
+
+        if covered == (left, top, right, bottom):
+            content = self.image.crop(covered)
+        else:
+            content = self.dimmed.crop((left, top, right, bottom))
+            content.paste(self.image.crop(covered), (covered[0] - left, covered[1] - top))
+        if tile is None:
+            from PIL import ImageTk
+            photo = ImageTk.PhotoImage(content.mode, content.size)
+            item = self.canvas.create_image(left, top, anchor=tk.NW, image=photo, tags="frame")
+            # Keep the tiles above the dimmed frame and below the crosshair
+            self.canvas.tag_lower("frame")
+            tile = self.tiles[(column, row)] = [item, photo, None]
+        tile[1].paste(content)
+        self.canvas.itemconfigure(tile[0], state=tk.NORMAL)
+        tile[2] = covered
+        self.pasted += 1
+
+    def destroy(self):
+        self.canvas.delete("frame")
+        self.tiles = {}
+        self.background_photo = None
+
+
+class Loupe:
+    """Magnified view of the pixels around the pointer, cut from a cached frame
+
+    RADIUS pixels either side of the pointer are shown ZOOM times larger
+    with nearest-neighbour scaling, the pointer's pixel outlined. The loupe
+    is a small window of its own so it stays opaque over a translucent
+    overlay. Its PhotoImage has a fixed size and is only pasted into, so an
+    update costs the same however large the desktop is.
+    """
+    RADIUS = 7
+    ZOOM = 8
+
+    def __init__(self, root):
+        from PIL import ImageTk
+        self.size = (2 * self.RADIUS + 1) * self.ZOOM
+        self.frame = None
+
+        self.window = tk.Toplevel(root)
+        self.window.withdraw()
+        self.window.overrideredirect(True)
+        self.window.attributes('-topmost', True)
+        self.photo = ImageTk.PhotoImage("RGB", (self.size, self.size))
+        tk.Label(self.window, image=self.photo, borderwidth=1, relief=tk.SOLID).pack()
+        # Frame times, only shown in debug mode
+        self.info = tk.Label(self.window, text="", bg='white', fg='black')
+
+    def show(self, frame, x, y, debug=False):
+        """Open the loupe at screen position (x, y), magnifying frame"""
+        self.frame = frame
+        if debug:
+            self.info.pack(fill=tk.X)
+        else:
+            self.info.pack_forget()
+        self.window.geometry(f"+{x}+{y}")
+        self.window.deiconify()
+        self.window.lift()
+
+    def hide(self):
+        self.window.withdraw()
+        self.frame = None
+
+    def update(self, x, y):
+        """Magnify around (x, y) in frame coordinates"""
+        from PIL import Image, ImageDraw
+        radius = self.RADIUS
+        # Parts outside the frame come out black
+        zoomed = self.frame.crop((x - radius, y - radius, x + radius + 1, y + radius + 1)).resize(
+            (self.size, self.size), Image.Resampling.NEAREST)
+        center = radius * self.ZOOM
+        ImageDraw.Draw(zoomed).rectangle(
+            (center - 1, center - 1, center + self.ZOOM, center + self.ZOOM), outline=(255, 0, 0))
+        self.photo.paste(zoomed)
+
+
+class OverlayPane:
+    """One overlay window covering a region of the screen
+
+    left and top are the region's offset within the virtual screen, used
+    to translate the pane's canvas coordinates into the shared ones.
+    """
+
+    def __init__(self, overlay):
+        self.overlay = overlay
+        self.region = None
+        self.left = 0
+        self.top = 0
+        self.frozen = None
+
+        self.window = tk.Toplevel(overlay.root)
+        # Hide straight away so it never flashes up while being built
+        self.window.withdraw()
+        self.window.overrideredirect(True)  # Remove window decorations
+        self.window.attributes('-alpha', 0.3)
+        self.window.configure(bg='black')
+
+        self.canvas = tk.Canvas(self.window, cursor="cross", bg='black', highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.coord_label = tk.Label(self.window, text="(0, 0)", bg='white', fg='black')
+        self.coord_label.place(x=10, y=10)
+
+        # Items are created once and only moved or hidden afterwards
+        self.crosshair_lines = [
+            self.canvas.create_line(0, 0, 0, 0, fill='red', dash=(2, 2), state=tk.HIDDEN),
+            self.canvas.create_line(0, 0, 0, 0, fill='red', dash=(2, 2), state=tk.HIDDEN)
+        ]
+        self.rect = self.canvas.create_rectangle(0, 0, 0, 0, outline='red', width=2, state=tk.HIDDEN)
+
+        self.canvas.bind("<Motion>", lambda e: overlay.on_motion(*self.to_virtual(e)))
+        self.canvas.bind("<ButtonPress-1>", lambda e: overlay.on_press(self, *self.to_virtual(e)))
+        self.canvas.bind("<B1-Motion>", lambda e: overlay.on_motion(*self.to_virtual(e)))
+        self.canvas.bind("<ButtonRelease-1>", lambda e: overlay.on_release(*self.to_virtual(e)))
+        self.canvas.bind("<Expose>", overlay.on_expose)
+        self.window.bind("<Escape>", lambda e: overlay.cancel())
+        self.window.bind("<FocusOut>", overlay.on_focus_out)
+
+    def place(self, region, virtual_screen):
+        """Cover region, an (x, y, width, height) screen area inside virtual_screen"""
+        x, y, width, height = region
+        # The origin can move while the region stays, e.g. a monitor added to the left
+        self.left = x - virtual_screen[0]
+        self.top = y - virtual_screen[1]
+        if region == self.region:
+            return
+        self.region = region
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+
+    def to_virtual(self, event):
+        """Event position in virtual screen coordinates"""
+        return event.x + self.left, event.y + self.top
+
+    def freeze(self, frame):
+        """Show this pane's part of frame, a still of the whole virtual screen, instead of the live screen"""
+        self.unfreeze()
+        x, y, width, height = self.region
+        self.frozen = FrozenFrame(self.canvas, frame.crop((self.left, self.top, self.left + width, self.top + height)))
+        self.window.attributes('-alpha', 1.0)
+
+    def unfreeze(self):
+        if self.frozen:
+            self.frozen.destroy()
+            self.frozen = None
+            self.window.attributes('-alpha', 0.3)
+
+    def reset(self):
+        for item in self.crosshair_lines + [self.rect]:
+            self.canvas.itemconfigure(item, state=tk.HIDDEN)
+        self.coord_label.config(text="(0, 0)")
+
+    def redraw(self, x, y, selection):
+        """Draw the crosshair at virtual point (x, y) and the selection rectangle, if any"""
+        width, height = self.region[2], self.region[3]
+        x -= self.left
+        y -= self.top
+        self.canvas.coords(self.crosshair_lines[0], x, 0, x, height)
+        self.canvas.coords(self.crosshair_lines[1], 0, y, width, y)
+        for line in self.crosshair_lines:
+            self.canvas.itemconfigure(line, state=tk.NORMAL)
+        if selection:
+            x1, y1, x2, y2 = selection
+            # The canvas clips the parts outside this pane
+            self.canvas.coords(self.rect, x1 - self.left, y1 - self.top, x2 - self.left, y2 - self.top)
+            self.canvas.itemconfigure(self.rect, state=tk.NORMAL)
+            if self.frozen:
+                self.frozen.set_selection((min(x1, x2) - self.left, min(y1, y2) - self.top,
+                                           max(x1, x2) - self.left, max(y1, y2) - self.top))
+
+    def destroy(self):
+        self.window.destroy()
+
+
+class SelectionOverlay:
+    """Translucent full-screen windows for picking an area, built once and reused
+
+    By default the windows are translucent over the live screen. When
+    show() is given a frame, a still of the whole virtual screen, the
+    windows are opaque and show that frame dimmed instead, with the
+    selection at full brightness (see FrozenFrame). Selecting is then
+    independent of what changes on screen meanwhile, and the compositor
+    has no alpha blending to do. With loupe, the frame also feeds a
+    magnifier (see Loupe), frozen or not. In debug mode the coordinate
+    display and the loupe show how long the last frame took to draw.
+
+    By default a single window covers the bounding box of all monitors.
+    With per_monitor, each monitor gets its own window instead, so
+    uneven layouts do not pay for blending the dead areas in between; the
+    windows share one selection, which can be dragged across monitors.
+
+    The windows are created hidden the first time they are needed, or
+    ahead of time with build(), and are only withdrawn between selections,
+    so opening the overlay again costs a reset and a deiconify. Areas
+    passed to on_select are (x, y, width, height) relative to the virtual
+    screen, like the main window's coordinates, together with the frozen
+    frame (or None), which uses the same coordinates; on_cancel gets
+    whether a drag had started. Pointer events only record the position, everything
+    is redrawn at most once per display frame.
+    """
+    FRAME_INTERVAL = 1 / 60
+
+    def __init__(self, root, on_select, on_cancel, per_monitor=False, loupe=False, debug=False):
+        self.root = root
+        self.on_select = on_select
+        self.on_cancel = on_cancel
+        self.per_monitor = per_monitor
+        self.use_loupe = loupe
+        self.debug = debug
+
+        self.panes = []
+        self.virtual_screen = None
+        self.frame = None
+        self.frozen = False
+        self.loupe = None
+
+        # Selection state, in virtual screen coordinates
+        self.active = False
+        self.started = False
+        self.start_x = None
+        self.start_y = None
+
+        # Redraw scheduling and timing
+        self.pointer = None
+        self.redraw_id = None
+        self.last_redraw = 0.0
+        self.shown_at = None
+        self.stats = {}
+
+    @property
+    def built(self):
+        return bool(self.panes)
+
+    def regions(self, virtual_screen, monitors):
+        """Screen areas to cover with overlay windows"""
+        if self.per_monitor and monitors:
+            return [(m.x, m.y, m.width, m.height) for m in monitors]
+        return [tuple(virtual_screen)]
+
+    def build(self, virtual_screen, monitors=None):
+        """Create the hidden windows, or fit them to a changed monitor layout"""
+        regions = self.regions(virtual_screen, monitors)
+        while len(self.panes) > len(regions):
+            self.panes.pop().destroy()
+        while len(self.panes) < len(regions):
+            self.panes.append(OverlayPane(self))
+        self.virtual_screen = tuple(virtual_screen)
+        for pane, region in zip(self.panes, regions):
+            pane.place(region, virtual_screen)
+
+    def show(self, virtual_screen, monitors=None, frame=None, frozen=True):
+        """Reset the selection and open the overlay
+
+        frame is a still of the whole virtual screen. It is shown instead of
+        the live screen when frozen, and feeds the loupe if that is enabled.
+        """
+        self.shown_at = time.perf_counter()
+        self.build(virtual_screen, monitors)
+        self.reset()
+        self.frame = frame
+        self.frozen = frame is not None and frozen
+        for pane in self.panes:
+            if self.frozen:
+                pane.freeze(frame)
+            else:
+                pane.unfreeze()
+        self.active = True
+        for pane in self.panes:
+            pane.window.deiconify()
+            pane.window.lift()
+        if self.use_loupe and frame is not None:
+            if self.loupe is None:
+                self.loupe = Loupe(self.root)
+            # Next to the first pane's coordinate display
+            region = self.panes[0].region
+            self.loupe.show(frame, region[0] + 10, region[1] + 40, self.debug)
+        # Make sure the overlay is focused
+        self.panes[0].window.focus_force()
+
+    def reset(self):
+        """Clear the previous selection without touching the windows"""
+        self.cancel_redraw()
+        for pane in self.panes:
+            pane.reset()
+        self.started = False
+        self.start_x = None
+        self.start_y = None
+        self.pointer = None
+        self.last_redraw = 0.0
+        self.stats = {"events": 0, "frames": 0, "total": 0.0, "max": 0.0, "last": 0.0, "open": None, "tiles": 0}
+
+    def hide(self):
+        self.cancel_redraw()
+        self.active = False
+        for pane in self.panes:
+            pane.window.withdraw()
+            # Frozen frames are large, do not keep them between selections
+            pane.unfreeze()
+        if self.loupe:
+            self.loupe.hide()
+        self.frame = None
+
+    def cancel(self):
+        """Close the overlay without selecting anything"""
+        if self.active:
+            self.hide()
+            self.on_cancel(self.started)
+
+    def cancel_redraw(self):
+        if self.redraw_id is not None:
+            self.root.after_cancel(self.redraw_id)
+            self.redraw_id = None
+
+    def on_focus_out(self, event):
+        # Focus may only be moving to another of the overlay's windows
+        self.root.after(50, self.check_focus)
+
+    def check_focus(self):
+        """Cancel the selection once focus has left every overlay window"""
+        if not self.active:
+            return
+        try:
+            focus = self.root.focus_get()
+        except KeyError:
+            focus = None
+        windows = [pane.window for pane in self.panes]
+        if focus is None or focus.winfo_toplevel() not in windows:
+            self.cancel()
+
+    def on_expose(self, event):
+        """Record how long the overlay took to appear"""
+        if self.shown_at is not None:
+            self.stats["open"] = time.perf_counter() - self.shown_at
+            self.shown_at = None
+
+    def on_motion(self, x, y):
+        """Remember the pointer position and schedule a redraw for the next frame"""
+        now = time.perf_counter()
+        # Keep the time of the first event since the last redraw, for the latency figure
+        since = self.pointer[2] if self.pointer and self.redraw_id else now
+        self.pointer = (x, y, since)
+        self.stats["events"] += 1
+        if self.redraw_id is None:
+            delay = self.last_redraw + self.FRAME_INTERVAL - now
+            if delay > 0:
+                self.redraw_id = self.root.after(int(delay * 1000) + 1, self.redraw)
+            else:
+                self.redraw_id = self.root.after_idle(self.redraw)
+
+    def on_press(self, pane, x, y):
+        self.started = True
+        self.start_x = x
+        self.start_y = y
+        # Keep keyboard focus where the drag happens, for Escape
+        pane.window.focus_force()
+        self.on_motion(x, y)
+
+    def on_release(self, x, y):
+        if not self.started:
+            return
+        x1 = min(self.start_x, x)
+        y1 = min(self.start_y, y)
+        x2 = max(self.start_x, x)
+        y2 = max(self.start_y, y)
+        frame = self.frame if self.frozen else None
+        self.hide()
+        self.on_select((x1, y1, x2 - x1, y2 - y1), frame)
+
+    def redraw(self):
+        """Move the crosshair, selection rectangle and coordinate display to the latest pointer position"""
+        self.redraw_id = None
+        x, y, since = self.pointer
+        stats = self.stats
+        start = time.perf_counter()
+        selection = (self.start_x, self.start_y, x, y) if self.started else None
+        text = f"({x}, {y})"
+        if self.debug and stats["frames"]:
+            text += f"  frame {stats['last'] * 1000:.1f} ms"
+        for pane in self.panes:
+            pane.redraw(x, y, selection)
+            pane.coord_label.config(text=text)
+        if self.loupe and self.loupe.frame is not None:
+            loupe_start = time.perf_counter()
+            self.loupe.update(x, y)
+            if self.debug:
+                self.loupe.info.config(text=f"loupe {(time.perf_counter() - loupe_start) * 1000:.1f} ms")
+
+        # Draw now, so the latency covers the actual redraw
+        self.root.update_idletasks()
+        self.last_redraw = time.perf_counter()
+        latency = self.last_redraw - since
+        stats["last"] = self.last_redraw - start
+        stats["tiles"] = sum(pane.frozen.pasted for pane in self.panes if pane.frozen)
+        stats["frames"] += 1
+        stats["total"] += latency
+        stats["max"] = max(stats["max"], latency)
+
+    def format_stats(self):
+        """Describe how quickly the last selection opened and followed the pointer"""
+        stats = self.stats
+        parts = []
+        if stats.get("open") is not None:
+            parts.append(f"opened in {stats['open'] * 1000:.0f} ms")
+        if stats.get("frames"):
+            parts.append(f"redraw {stats['total'] / stats['frames'] * 1000:.1f} ms avg, "
+                         f"{stats['max'] * 1000:.1f} ms max, "
+                         f"{stats['frames']} frames for {stats['events']} events")
+        if stats.get("tiles"):
+            parts.append(f"{stats['tiles']} tiles updated")
+        return ", ".join(parts) or "no redraws"
@@ -0,0 +1,141 @@
+import copy
+import json
+import os
+import threading
+
+
+SETTINGS_FILE = "screenshot_settings.json"
+
+DEFAULT_SETTINGS = {
+    "master_folder": "",
+    "window_geometry": None,
+    "window_state": {},
+    "save_workers": 2,
+    "save_queue_size": 8,
+    "hide_mode": "overlap",
+    "hide_fallback_delay": 0.2,
+    "hide_settle_delay": 0.016,
+    "capture_backend": "auto",
+    "burst_frames": 30,
+    "burst_fps": 10,
+    "burst_max_mb": 512,
+    "burst_encode_during": True,
+    "replay_fps": 1,
+    "replay_max_mb": 256,
+    "replay_seconds": 60,
+    "replay_dump_seconds": 10,
+    "replay_eviction": "oldest",
+    "replay_format": "png",
+    "replay_hotkey": "<F9>",
+    "encoder": "png",
+    "folder_encoders": {},
+    "dedup_mode": "off",
+    "capture_index_file": "screenshot_index.db",
+    "thumbnail_cache_dir": "screenshot_thumbnails",
+    "thumbnail_cache_mb": 64,
+    "selection_per_monitor": False,
+    "selection_mode": "live",
+    "frozen_save_on_release": False,
+    "selection_loupe": False,
+    "debug_overlay": False,
+    "watch_threshold": 0.01,
+    "watch_fps": 4,
+    "watch_debounce": 0.5,
+    "watch_max_rate": 1.0,
+    "watch_cpu_budget": 0.1
+}
+
+
+def load_settings(path=SETTINGS_FILE):
+    """Load settings from JSON file on top of the defaults"""
+    settings = copy.deepcopy(DEFAULT_SETTINGS)
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                settings.update(json.load(f))
+    except Exception as e:
+        print(f"Error loading settings: {e}")
+    return settings
+
+
+def write_atomic(path, text):
+    """Replace path with text, so a crash mid-write leaves the old file intact"""
+    temp_name = path + ".tmp"
+    with open(temp_name, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_name, path)
+
+
+def save_settings(settings, path=SETTINGS_FILE):
+    """Save settings to JSON file"""
+    try:
+        write_atomic(path, json.dumps(settings, indent=4))
+    except Exception as e:
+        print(f"Error saving settings: {e}")
+
+
+class SettingsStore:
+    """Settings kept in memory and written to disk only when they changed
+
+    save() compares the settings against what was last written and, if
+    they differ, schedules a write debounce seconds later on a timer
+    thread, so a run of changes costs one write and callers never wait on
+    the disk. Writes are atomic (see write_atomic). flush() writes a
+    pending change straight away and must be called before exiting.
+    """
+
+    def __init__(self, path=SETTINGS_FILE, debounce=1.0):
+        self.path = path
+        self.debounce = debounce
+        self.settings = load_settings(path)
+        self.written = json.dumps(self.settings, indent=4)
+        self.pending = None
+        self.timer = None
+        self.lock = threading.Lock()
+        # Held while writing, so the Tk thread only ever waits on self.lock briefly
+        self.write_lock = threading.Lock()
+        self.writes = 0
+
+    def save(self):
+        """Schedule a write if the settings changed, returning True if one is due"""
+        # Serialised here, so later changes to the dict cannot race the write
+        text = json.dumps(self.settings, indent=4)
+        with self.lock:
+            if text == (self.pending or self.written):
+                return False
+            self.pending = text
+            if self.timer is None:
+                self.timer = threading.Timer(self.debounce, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        return True
+
+    def flush(self):
+        """Write a pending change now"""
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                text = self.pending
+                self.pending = None
+            if text is None:
+                return
+            try:
+                write_atomic(self.path, text)
+                self.written = text
+                self.writes += 1
+            except Exception as e:
+                print(f"Error saving settings: {e}")
+
+
+def folder_path(settings, folder_name):
+    """Folder captures for folder_name are saved to"""
+    return os.path.join(settings["master_folder"], folder_name)
+
+
+def folder_encoder_config(settings, folder_name):
+    """Encoder config for folder_name, falling back to the default format"""
+    return settings["folder_encoders"].get(folder_name, settings["encoder"])
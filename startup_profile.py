@@ -0,0 +1,55 @@
+import contextlib
+import sys
+import threading
+import time
+
+
+class StartupProfiler:
+    """Record how long each step of starting the tool takes
+
+    Times are kept relative to start, which should be taken before the
+    main module imports anything, so module loading is included. Phases
+    can be recorded from any thread; marks are single points in time such
+    as the first paint of the window.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = []
+        self.marks = {}
+        self.modules = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, started, finished):
+        """Record a phase that ran from started to finished (perf_counter values)"""
+        with self.lock:
+            self.phases.append((name, threading.current_thread().name, started - self.start, finished - started))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, started, time.perf_counter())
+
+    def mark(self, name):
+        """Record that name happened now, keeping the first time only"""
+        with self.lock:
+            self.marks.setdefault(name, time.perf_counter() - self.start)
+            # Which modules had been loaded by then, to catch imports creeping back in
+            self.modules.setdefault(name, set(sys.modules))
+        return self.marks[name]
+
+    def loaded_by(self, name, modules):
+        """Those of modules that were already imported when name was marked"""
+        return [module for module in modules if module in self.modules.get(name, ())]
+
+    def report(self):
+        """Phases and marks in start order, in milliseconds since start"""
+        lines = ["Startup profile (ms since launch):"]
+        entries = [(start, f"  {start * 1000:7.1f}  +{duration * 1000:6.1f}  {name} [{thread}]")
+                   for name, thread, start, duration in self.phases]
+        entries += [(at, f"  {at * 1000:7.1f}           {name}") for name, at in self.marks.items()]
+        lines += [line for _, line in sorted(entries)]
+        return "\n".join(lines)
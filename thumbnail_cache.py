@@ -0,0 +1,165 @@
+import collections
+import hashlib
+import os
+import threading
+
+from preview import fit
+
+
+class ThumbnailCache:
+    """Thumbnails of saved captures, made once and kept on disk
+
+    Each thumbnail is stored in folder as a small JPEG named after a hash
+    of the capture's path and modification time, so an edited or replaced
+    capture simply gets a new thumbnail and the old one ages out. The
+    folder is kept under max_bytes by evicting the least recently used
+    thumbnails; use is recorded in the file times, so the order survives
+    restarts. Thumbnails are made on worker threads with the same fit()
+    as the preview. Like PreviewRenderer, only the latest request counts:
+    request() replaces whatever is still waiting, so scrolling past rows
+    never queues work for them.
+    """
+    EXTENSION = ".jpg"
+
+    def __init__(self, folder, max_bytes=64 * 1024 * 1024, size=(120, 90), background=(217, 217, 217), workers=2):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.size = size
+        self.background = background
+        self.worker_count = max(1, workers)
+        self.condition = threading.Condition()
+        self.pending = []
+        self.results = []
+        # Paths a worker is making a thumbnail for right now
+        self.working = set()
+        self.workers = []
+        self.stopped = False
+
+        # Cache file name to size in bytes, least recently used first
+        self.entries = None
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.made = 0
+        self.evicted = 0
+
+    def request(self, paths):
+        """Make thumbnails for paths available to poll(), in order, dropping earlier requests"""
+        with self.condition:
+            if not self.workers:
+                for i in range(self.worker_count):
+                    worker = threading.Thread(target=self._run, name=f"thumbnails-{i}", daemon=True)
+                    worker.start()
+                    self.workers.append(worker)
+            # Popped from the end
+            self.pending = list(reversed(paths))
+            self.condition.notify_all()
+
+    def poll(self):
+        """Thumbnails finished since the last call, as (path, image) pairs"""
+        with self.condition:
+            results = self.results
+            self.results = []
+        return results
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def key(self, path):
+        """Cache file name for the current version of path"""
+        mtime = os.stat(path).st_mtime_ns
+        digest = hashlib.blake2b(f"{os.path.abspath(path)}\0{mtime}".encode(), digest_size=16)
+        return digest.hexdigest() + self.EXTENSION
+
+    def _load(self):
+        """Read the cache folder once, oldest use first"""
+        entries = []
+        try:
+            with os.scandir(self.folder) as found:
+                for entry in found:
+                    if entry.name.endswith(self.EXTENSION):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except FileNotFoundError:
+            pass
+        entries.sort()
+        self.entries = collections.OrderedDict((name, size) for _, name, size in entries)
+        self.total_bytes = sum(self.entries.values())
+
+    def get(self, path):
+        """Thumbnail image of path, from the cache or made now"""
+        from PIL import Image
+        name = self.key(path)
+        cached = os.path.join(self.folder, name)
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            hit = name in self.entries
+            if hit:
+                self.entries.move_to_end(name)
+        if hit:
+            try:
+                with Image.open(cached) as image:
+                    image.load()
+                os.utime(cached)
+                self.hits += 1
+                return image
+            except OSError:
+                # Removed or cut short, make it again
+                pass
+
+        with Image.open(path) as image:
+            # JPEG files can be decoded at a fraction of their size straight away
+            image.draft("RGB", (self.size[0] * 2, self.size[1] * 2))
+            thumbnail = fit(image.convert("RGB"), self.size, self.background)
+        self._store(name, cached, thumbnail)
+        self.made += 1
+        return thumbnail
+
+    def _store(self, name, cached, thumbnail):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temp_name = cached + ".part"
+            thumbnail.save(temp_name, "JPEG", quality=85)
+            os.replace(temp_name, cached)
+            size = os.path.getsize(cached)
+        except OSError as e:
+            print(f"Error caching thumbnail: {e}")
+            return
+        with self.lock:
+            self.total_bytes += size - self.entries.get(name, 0)
+            self.entries[name] = size
+            self.entries.move_to_end(name)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                oldest, oldest_size = self.entries.popitem(last=False)
+                self.total_bytes -= oldest_size
+                self.evicted += 1
+                try:
+                    os.remove(os.path.join(self.folder, oldest))
+                except OSError:
+                    pass
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                path = self.pending.pop()
+                if path in self.working:
+                    continue
+                self.working.add(path)
+            try:
+                thumbnail = self.get(path)
+            except Exception as e:
+                print(f"Error making thumbnail for {path}: {e}")
+                thumbnail = None
+            with self.condition:
+                self.working.discard(path)
+                if thumbnail is not None:
+                    self.results.append((path, thumbnail))